@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import argparse
+import os
+import random
+import socket
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Local imports
+from wumpus.game import Game
+from wumpus.capture import Capture
+from wumpus.const import Input
+from wumpus.const import ROOMS
+from wumpus.const import TRACE_MAX_HOPS
+from wumpus.const import TRACE_PPH
+from wumpus.const import TRACE_PREFIX_GAME
+from wumpus.const import TRACE_PREFIX_MOVE
+from wumpus.const import TRACE_PREFIX_SHOOT
+from wumpus.iputil import FIXED_HOST_BYTES
+from wumpus.iputil import FIXED_HOST_VALUE_OFFSET
+from wumpus.iputil import FIXED_HOST_VALUES
+from wumpus.iputil import cidr2int
+from wumpus.iputil import game_ip
+from wumpus.iputil import int2ip
+from wumpus.iputil import ip2packed
+from wumpus.iputil import key2ip
+from wumpus.iputil import move_ip
+from wumpus.iputil import shoot_ip
+from wumpus.score import HighScore
+from wumpus.server import Server
+from wumpus.session import Session
+from wumpus.sim import compare
+from wumpus.sim import simulate
+from wumpus.stats import Histogram
+from wumpus.store import SessionStore
+
+# Pcap file format (magic by byte order, global header, record header)
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': '<', b'\xa1\xb2\xc3\xd4': '>',  # microsecond timestamps
+    b'\x4d\x3c\xb2\xa1': '<', b'\xa1\xb2\x3c\x4d': '>',  # nanosecond timestamps
+}
+PCAP_HEADER = struct.Struct('<4sHHiIII')
+PCAP_RECORD = 'IIII'
+
+# Pcap link types (Ethernet frames or raw IP packets)
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+
+# Ethernet header of synthesized frames (and raw IP packets, without EtherType)
+ETHERNET_HEADER = bytes.fromhex('020000000001' '020000000002')
+ETHERTYPES = {4: b'\x08\x00', 6: b'\x86\xdd'}
+
+
+def bench_sessions(args):
+    """ Measure per-packet cost for growing numbers of active sessions.
+    """
+    # Iterate session counts
+    target = game_ip(Input.Game.MAP)
+    for n_sessions in args.sessions:
+        game = Game()
+
+        # Populate session table with idle players
+        clients = [client_key(n) for n in range(n_sessions)]
+        for client in clients:
+            game.sessions.add(client, Session(game.log_debug, client))
+
+        # Handle one probe per client (avoiding cached replies)
+        n_probes = min(args.probes, n_sessions)
+        start = time.perf_counter()
+        for client in clients[:n_probes]:
+            game.handle_input(client, target)
+        duration = time.perf_counter() - start
+
+        # Print result
+        print(f'sessions={n_sessions:>8} probes={n_probes:>6} per_probe={duration / n_probes * 1e6:8.2f}us')
+
+
+def bench_memory(args):
+    """ Measure memory footprint of idle and playing sessions.
+    """
+    # Iterate session states
+    game = Game()
+    for playing in (False, True):
+        store = SessionStore()
+        clients = [client_key(n) for n in range(args.sessions)]
+
+        # Populate session table (not counting client keys)
+        tracemalloc.start()
+        for client in clients:
+            session = Session(game.log_debug, client)
+            if playing is True:
+                session.new()
+            store.add(client, session)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Print result
+        state = 'playing' if playing is True else 'idle'
+        print(f'sessions={args.sessions:>8} state={state:<7} total={size / 2**20:8.1f}MiB '
+              f'per_session={size / args.sessions:6.0f}B')
+
+
+def bench_packets(args):
+    """ Measure packet engine throughput on synthesized traceroute frames.
+    """
+    # Synthesize traceroute runs (TRACE_PPH probes per hop)
+    targets = [game_ip(action) for action in (Input.Game.START, Input.Game.MAP, Input.Game.HELP)]
+    frames = list()
+    for n_client in range(args.clients):
+        client, target = f'2001:db8::{n_client:x}', random.choice(targets)
+        for hlim in range(1, TRACE_MAX_HOPS + 1):
+            for n_probe in range(TRACE_PPH):
+                frames.append(probe_frame(client, target, hlim, 33434 + hlim * TRACE_PPH + n_probe))
+
+    # Prepare server (optionally on a local socket pair instead of a network interface)
+    link = None
+    if args.loopback is True:
+        link, sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        server = Server(Game(), Capture(batch=args.batch, sock=sock))
+    else:
+        server = Server(Game(), None)
+
+    # Handle frames in batches
+    n_replies = 0
+    start = time.perf_counter()
+    for n_frame in range(0, len(frames), args.batch):
+        batch = frames[n_frame:n_frame + args.batch]
+        if link is None:
+            n_replies += len(server.handle_batch(batch))
+            continue
+        for frame in batch:
+            link.send(frame)
+        server.capture.send_batch(server.handle_batch(server.capture.recv_batch(0)))
+        while True:
+            try:
+                link.recv(4096, socket.MSG_DONTWAIT)
+                n_replies += 1
+            except BlockingIOError:
+                break
+    duration = time.perf_counter() - start
+
+    # Print result
+    print(f'probes={len(frames)} replies={n_replies} probes/s={len(frames) / duration:,.0f}')
+
+
+def bench_traffic(args):
+    """ Measure game engine throughput, latency and memory on synthesized traceroute traffic.
+    """
+    # Synthesize traffic (optionally written to a pcap file for replay)
+    probes = synthesize(args.clients, args.scans, args.seed)
+    if args.pcap is not None:
+        write_pcap(args.pcap, [probe_frame(key2ip(client), target, hlim, 33434 + hlim * TRACE_PPH + n % TRACE_PPH)
+                               for n, (client, target, hlim) in enumerate(probes)])
+
+    # Drive game engine (one probe per call, or in batches)
+    def engine(game):
+        """ Return handler of probe batches.
+        """
+        if args.batch is None:
+            return lambda batch: [game.handle_input(client, target) for client, target, _ in batch]
+        return lambda batch: game.handle_batch([(client, target, None) for client, target, _ in batch])
+    batch = args.batch if args.batch is not None else 1
+    measure(engine, [probes[n_probe:n_probe + batch] for n_probe in range(0, len(probes), batch)])
+
+
+def bench_replay(args):
+    """ Measure packet engine throughput, latency and memory on frames replayed from pcap files.
+    """
+    # Read frames
+    frames = list()
+    for path in args.pcap:
+        frames += read_pcap(path)
+
+    # Drive packet engine (in batches)
+    def engine(game):
+        """ Return handler of frame batches.
+        """
+        return Server(game, None).handle_batch
+    measure(engine, [frames[n_frame:n_frame + args.batch] for n_frame in range(0, len(frames), args.batch)])
+
+
+def bench_simulate(args):
+    """ Measure vectorized game simulations and compare their results with games played with sessions.
+    """
+    # Measure simulation throughput
+    start = time.perf_counter()
+    simulate(args.games, seed=args.seed)
+    duration = time.perf_counter() - start
+    print(f'games={args.games} games/s={args.games / duration:,.0f}')
+
+    # Compare outcome rates and mean actions
+    passed, rows = compare(args.games, args.scalar_games, seed=args.seed)
+    for name, simulated, scalar, z in rows:
+        print(f'{name:<8} simulated={simulated:8.4f} scalar={scalar:8.4f} z={z:+6.2f}')
+    print('agreement=' + ('ok' if passed is True else 'FAILED'))
+
+
+def measure(engine, batches):
+    """ Drive fresh game engines with given batches at maximum rate and print throughput, latency and memory.
+
+    Each batch is passed to the handler returned by engine(game). Throughput, latency and allocated blocks are measured
+    in a first pass, memory of sessions and caches is traced with tracemalloc in a second pass on a fresh engine.
+    """
+    # Measure throughput and per-probe latency (and memory blocks still allocated afterwards)
+    n_probes = sum(len(batch) for batch in batches)
+    with tempfile.TemporaryDirectory() as path:
+        game = bench_game(path)
+        handle, histogram = engine(game), Histogram()
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        for batch in batches:
+            batch_start = time.perf_counter()
+            handle(batch)
+            histogram.add((time.perf_counter() - batch_start) / len(batch))
+        duration = time.perf_counter() - start
+        blocks = sys.getallocatedblocks() - blocks
+        game.highscore.close()
+
+        # Measure memory of a fresh engine
+        game = bench_game(path)
+        handle = engine(game)
+        tracemalloc.start()
+        for batch in batches:
+            handle(batch)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        game.highscore.close()
+
+    # Print result
+    n_sessions = len(game.sessions)
+    print(f'probes={n_probes} probes/s={n_probes / duration:,.0f} p50<={histogram.percentile(50) * 1e6:.0f}us '
+          f'p99<={histogram.percentile(99) * 1e6:.0f}us blocks/probe={blocks / n_probes:.2f}')
+    print(f'sessions={n_sessions} memory={size / 2**20:.1f}MiB '
+          f'per_session={size / n_sessions if n_sessions > 0 else 0:.0f}B')
+
+
+def bench_game(path, **options):
+    """ Return game engine keeping its highscore in given directory.
+    """
+    return Game(highscore=HighScore(os.path.join(path, 'score.csv'), os.path.join(path, 'score.top.csv')), **options)
+
+
+def synthesize(n_clients, scans, seed):
+    """ Synthesize traceroute probes as (client key, target, hop limit) tuples.
+
+    Each client runs traceroutes (TRACE_PPH probes per hop) to start and play a game, walks the map, shoots and looks
+    at another screen. Runs of all clients are interleaved, and scans (single probes of random sources to random hosts
+    under the command prefixes, see scan_host()) are mixed in at the given ratio of all probes.
+    """
+    # Prepare traceroute targets of each client
+    rnd = random.Random(seed)
+    runs = list()
+    for n_client in range(n_clients):
+        room = rnd.choice(list(ROOMS))
+        targets = [game_ip(Input.Game.START), game_ip(Input.Game.PLAY)]
+        for _ in range(rnd.randint(2, 8)):
+            room = rnd.choice(ROOMS[room])
+            targets.append(move_ip(room))
+        targets.append(shoot_ip([rnd.choice(ROOMS[room])]))
+        targets.append(game_ip(rnd.choice([Input.Game.HELP, Input.Game.MAP, Input.Game.SCORE, Input.Game.REPLAY])))
+        runs.append((client_key(n_client), targets[::-1]))
+
+    # Interleave traceroute runs of clients
+    probes = list()
+    while len(runs) > 0:
+        n_run = rnd.randrange(len(runs))
+        client, targets = runs[n_run]
+        target = targets.pop()
+        if len(targets) == 0:
+            runs[n_run] = runs[-1]
+            runs.pop()
+        probes += [(client, target, hlim) for hlim in range(1, TRACE_MAX_HOPS + 1) for _ in range(TRACE_PPH)]
+
+    # Mix in scans
+    prefixes = [cidr2int(prefix)[0] for prefix in (TRACE_PREFIX_GAME, TRACE_PREFIX_MOVE, TRACE_PREFIX_SHOOT)]
+    for _ in range(int(len(probes) * scans / (1 - scans)) if scans < 1 else 0):
+        target = int2ip(rnd.choice(prefixes) + scan_host(rnd))
+        probes.insert(rnd.randrange(len(probes) + 1), (client_key(2**32 + rnd.getrandbits(32)), target, 64))
+    return probes
+
+
+def scan_host(rnd):
+    """ Return random fixed-length host of a scan probe.
+
+    Each 16 bit group is drawn either from the valid values (decoded as command actions) or from all 16 bit values
+    (including groups below the value offset, which decode to invalid actions).
+    """
+    host = 0
+    for _ in range(FIXED_HOST_BYTES // 2):
+        if rnd.random() < 0.5:
+            group = rnd.randrange(FIXED_HOST_VALUE_OFFSET, FIXED_HOST_VALUE_OFFSET + FIXED_HOST_VALUES)
+        else:
+            group = rnd.getrandbits(16)
+        host = (host << 16) + group
+    return host
+
+
+def read_pcap(path):
+    """ Read frames from pcap file (raw IP packets are prefixed with an Ethernet header).
+    """
+    with open(path, 'rb') as fh:
+        # Parse global header
+        header = fh.read(PCAP_HEADER.size)
+        order = PCAP_MAGIC.get(header[:4], None)
+        if len(header) < PCAP_HEADER.size or order is None:
+            raise ValueError(f'invalid pcap file: {path}')
+        linktype = struct.unpack(f'{order}I', header[20:24])[0] & 0xffff
+        if linktype not in {LINKTYPE_ETHERNET, LINKTYPE_RAW}:
+            raise ValueError(f'unsupported pcap link type: {linktype}')
+        record = struct.Struct(f'{order}{PCAP_RECORD}')
+
+        # Read records (ignoring a truncated last record)
+        frames = list()
+        while True:
+            data = fh.read(record.size)
+            if len(data) < record.size:
+                break
+            _, _, caplen, _ = record.unpack(data)
+            frame = fh.read(caplen)
+            if len(frame) < caplen:
+                break
+            if linktype == LINKTYPE_RAW:
+                frame = ETHERNET_HEADER + ETHERTYPES.get(frame[0] >> 4, b'\x00\x00') + frame
+            frames.append(frame)
+    return frames
+
+
+def write_pcap(path, frames):
+    """ Write Ethernet frames to pcap file.
+    """
+    with open(path, 'wb') as fh:
+        fh.write(PCAP_HEADER.pack(b'\xd4\xc3\xb2\xa1', 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for n_frame, frame in enumerate(frames):
+            fh.write(struct.pack(f'<{PCAP_RECORD}', n_frame // 1000000, n_frame % 1000000, len(frame), len(frame)))
+            fh.write(frame)
+
+
+def client_key(n_client):
+    """ Return 16 byte key of n-th client in 2001:db8::/32.
+    """
+    return ((0x20010db8 << 96) + n_client).to_bytes(16, 'big')
+
+
+def probe_frame(src, dst, hlim, sport, dport=33434):
+    """ Synthesize Ethernet/IPv6/UDP traceroute probe.
+    """
+    udp = struct.pack('!HHHH', sport, dport, 8 + 32, 0) + bytes(32)
+    ipv6 = struct.pack('!IHBB', 6 << 28, len(udp), socket.IPPROTO_UDP, hlim) + ip2packed(src) + ip2packed(dst)
+    return ETHERNET_HEADER + ETHERTYPES[6] + ipv6 + udp
+
+
+def main():
+    """ Run selected benchmark.
+    """
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='TRACE_THE_WUMPUS benchmarks')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    # Session table benchmark
+    parser_sessions = commands.add_parser('sessions', help='per-packet cost vs. number of sessions')
+    parser_sessions.add_argument('--sessions', type=int, nargs='+', default=[10, 1000, 100000, 1000000])
+    parser_sessions.add_argument('--probes', type=int, default=10000)
+    parser_sessions.set_defaults(func=bench_sessions)
+
+    # Session memory benchmark
+    parser_memory = commands.add_parser('memory', help='memory footprint of sessions')
+    parser_memory.add_argument('--sessions', type=int, default=1000000)
+    parser_memory.set_defaults(func=bench_memory)
+
+    # Packet engine benchmark
+    parser_packets = commands.add_parser('packets', help='packet engine throughput on synthesized frames')
+    parser_packets.add_argument('--clients', type=int, default=1000)
+    parser_packets.add_argument('--batch', type=int, default=64)
+    parser_packets.add_argument('--loopback', action='store_true', help='pass frames through a local socket pair')
+    parser_packets.set_defaults(func=bench_packets)
+
+    # Synthesized traffic benchmark
+    parser_traffic = commands.add_parser('traffic', help='game engine performance on synthesized traceroute traffic')
+    parser_traffic.add_argument('--clients', type=int, default=1000)
+    parser_traffic.add_argument('--scans', type=float, default=0.1, help='ratio of scan probes')
+    parser_traffic.add_argument('--seed', type=int, default=0)
+    parser_traffic.add_argument('--pcap', help='write synthesized traffic to pcap file')
+    parser_traffic.add_argument('--batch', type=int, default=None, help='probes per call of the batch API')
+    parser_traffic.set_defaults(func=bench_traffic)
+
+    # Pcap replay benchmark
+    parser_replay = commands.add_parser('replay', help='packet engine performance on frames replayed from pcap files')
+    parser_replay.add_argument('pcap', nargs='+')
+    parser_replay.add_argument('--batch', type=int, default=64)
+    parser_replay.set_defaults(func=bench_replay)
+
+    # Game simulation benchmark
+    parser_simulate = commands.add_parser('simulate', help='vectorized game simulations (requires numpy)')
+    parser_simulate.add_argument('--games', type=int, default=1000000)
+    parser_simulate.add_argument('--scalar-games', type=int, default=20000)
+    parser_simulate.add_argument('--seed', type=int, default=None)
+    parser_simulate.set_defaults(func=bench_simulate)
+
+    # Run benchmark
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import os
+import socket
+import struct
+
+# Third-party imports
+import pytest
+
+# Local imports
+from wumpus.capture import ETH_P_ALL
+from wumpus.capture import Capture
+from wumpus.capture import shard_index
+from wumpus.iputil import ip2packed
+from wumpus.packet import ETH_P_IP
+from wumpus.packet import ETH_P_IPV6
+
+
+def probe_frame(src, dst):
+    """ Return Ethernet frame of an UDP traceroute probe from given source to given destination address.
+    """
+    udp = struct.pack('!HHHH', 33434, 33434, 8, 0)
+    if ':' in src:
+        ip = struct.pack('!IHBB', 6 << 28, len(udp), socket.IPPROTO_UDP, 1) + ip2packed(src) + ip2packed(dst)
+        return bytes(12) + struct.pack('!H', ETH_P_IPV6) + ip + udp
+    ip = struct.pack('!BBHHHBBH', 0x45, 0, 20 + len(udp), 0, 0, 1, socket.IPPROTO_UDP, 0)
+    ip += socket.inet_aton(src) + socket.inet_aton(dst)
+    return bytes(12) + struct.pack('!H', ETH_P_IP) + ip + udp
+
+
+def test_fanout_shards_received_frames_by_client():
+    """ Frames received on loopback reach the shard of their source address (see shard_index()), whatever the target.
+    """
+    # Join fanout group on loopback
+    n_shards = 3
+    try:
+        shards = [Capture('lo', fanout=(os.getpid(), n_shards)) for _ in range(n_shards)]
+        sender = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        sender.bind(('lo', 0))
+    except (PermissionError, OSError) as error:
+        pytest.skip(f'no raw loopback capture: {error}')
+
+    # Send probes of several clients to different command prefixes
+    probes = dict()
+    for client in ['2001:db8::1:7', '2001:db8::1:8', '2001:db8::2:1', '2001:db8::dead:beef', '192.0.2.7', '192.0.2.8']:
+        targets = ['2a06:2904::', '2a06:2905::', '2a06:2906::'] if ':' in client else ['194.145.125.129']
+        for target in targets:
+            frame = probe_frame(client, target)
+            probes[frame] = shard_index(ip2packed(client), n_shards)
+            sender.send(frame)
+
+    # Check shard of received probes
+    received = dict()
+    try:
+        for n_shard, capture in enumerate(shards):
+            while True:
+                frames = capture.recv_batch(timeout=0.2)
+                if len(frames) == 0:
+                    break
+                received.update((bytes(frame), n_shard) for frame in frames if bytes(frame) in probes)
+    finally:
+        sender.close()
+        for capture in shards:
+            capture.close()
+    assert received == probes
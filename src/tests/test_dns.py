@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import struct
+
+# Local imports
+from wumpus.const import TRACE_PREFIX_GAME
+from wumpus.const import TRACE_PREFIX_OUTPUT
+from wumpus.const import Input
+from wumpus.const import Output
+from wumpus.dns import RCODE_NOERROR
+from wumpus.dns import RCODE_NXDOMAIN
+from wumpus.dns import RCODE_REFUSED
+from wumpus.dns import TYPE_PTR
+from wumpus.dns import PtrResponder
+from wumpus.dns import default_names
+from wumpus.dns import encode_name
+from wumpus.dns import load_names
+from wumpus.iputil import cidr2rdns
+from wumpus.iputil import game_ip
+from wumpus.iputil import output_ip
+
+
+def query(responder, name):
+    """ Return response code and answer names of a PTR query for given name.
+    """
+    response = responder.handle_query(struct.pack('!HHHHHH', 0x1234, 0x0100, 1, 0, 0, 0) + encode_name(name) +
+                                      struct.pack('!HH', TYPE_PTR, 1))
+    assert response[:2] == b'\x12\x34'
+    question_end = 12 + len(encode_name(name)) + 4
+    answers = [response[question_end + 12:]] if struct.unpack('!H', response[6:8])[0] > 0 else list()
+    return response[3] & 0x0f, answers
+
+
+def test_default_names():
+    """ Game actions and output lines of the built-in screens are answered without a mapping file.
+    """
+    responder = PtrResponder(default_names(), None)
+    zone = cidr2rdns(TRACE_PREFIX_GAME)
+    assert query(responder, f'{game_ip(Input.Game.PLAY, fwd=False)}.{zone}') == (
+        RCODE_NOERROR, [encode_name('play.wumpus.quest')])
+    zone = cidr2rdns(TRACE_PREFIX_OUTPUT)
+    assert query(responder, f'{output_ip(Output.INFO_TITLE[0], fwd=False)}.{zone}') == (
+        RCODE_NOERROR, [encode_name('info-title-1.wumpus.quest')])
+    assert query(responder, f'{output_ip(Output.GAME_WIN, fwd=False)}.{zone}') == (
+        RCODE_NOERROR, [encode_name('game-win.wumpus.quest')])
+
+    # Unknown names within and outside the zones
+    assert query(responder, f'{output_ip(250, fwd=False)}.{zone}') == (RCODE_NXDOMAIN, list())
+    assert query(responder, 'wumpus.quest') == (RCODE_REFUSED, list())
+
+
+def test_names_file_replaces_default_names(tmp_path):
+    """ Names of a mapping file replace built-in names.
+    """
+    path = tmp_path / 'names.txt'
+    path.write_text('# Sample mapping\ngame 1 new-game.example.org\n', encoding='utf-8')
+    names = default_names()
+    names.update(load_names(str(path)))
+    responder = PtrResponder(names, None)
+    zone = cidr2rdns(TRACE_PREFIX_GAME)
+    assert query(responder, f'{game_ip(Input.Game.PLAY, fwd=False)}.{zone}') == (
+        RCODE_NOERROR, [encode_name('new-game.example.org')])
+    assert query(responder, f'{game_ip(Input.Game.HELP, fwd=False)}.{zone}') == (
+        RCODE_NOERROR, [encode_name('help.wumpus.quest')])
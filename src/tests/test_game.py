@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import math
+import random
+import time
+
+# Local imports
+from wumpus.const import GAME_TIMEOUT
+from wumpus.const import ROOMS
+from wumpus.const import Input
+from wumpus.const import Output
+from wumpus.game import SNAPSHOT_HEADER
+from wumpus.game import SNAPSHOT_MAGIC
+from wumpus.game import Game
+from wumpus.iputil import game_ip
+from wumpus.iputil import ip2key
+from wumpus.iputil import ip2packed
+from wumpus.iputil import move_ip
+from wumpus.iputil import output_ip
+from wumpus.limit import RateLimiter
+from wumpus.score import HighScore
+from wumpus.session import Session
+from wumpus.stats import Metrics
+
+
+def make_game(tmp_path, **options):
+    """ Return game engine with highscore files in given directory.
+    """
+    return Game(highscore=HighScore(str(tmp_path / 'score.csv'), str(tmp_path / 'score.top.csv')), **options)
+
+
+def test_clients_share_session_by_key(tmp_path):
+    """ Probes of the same client given as address string or packed address share a single session.
+    """
+    game = make_game(tmp_path)
+    game.handle_input('2001:0db8::0001', game_ip(Input.Game.PLAY))
+    output = game.handle_input(ip2packed('2001:db8::1'), ip2packed(game_ip(Input.Game.REPLAY)), packed=True)
+    assert list(game.sessions) == [ip2key('2001:db8::1')]
+    assert output != game.handle_input('2001:db8::2', ip2packed(game_ip(Input.Game.REPLAY)), packed=True)
+
+
+def test_sessions_created_lazily(tmp_path):
+    """ Sessions are only created for commands depending on them (PLAY and HELP).
+    """
+    game = make_game(tmp_path)
+    for n, target in enumerate([game_ip(Input.Game.START), game_ip(Input.Game.MAP), game_ip(Input.Game.SCORE),
+                                game_ip(Input.Game.REPLAY), move_ip(1), '2a06:2904::ffff']):
+        game.handle_input(f'2001:db8::{n + 1:x}', target)
+    assert len(game.sessions) == 0
+    game.handle_input('2001:db8::a', game_ip(Input.Game.HELP))
+    game.handle_input('2001:db8::b', game_ip(Input.Game.PLAY))
+    assert list(game.sessions) == [ip2key('2001:db8::a'), ip2key('2001:db8::b')]
+
+
+def test_repeated_probes_answered_from_cache(tmp_path):
+    """ Repeated probes of a traceroute run return the output of their first probe (and apply the command once).
+    """
+    # Start game
+    game = make_game(tmp_path, metrics=Metrics())
+    client = '2001:db8::1'
+    game.handle_input(client, game_ip(Input.Game.PLAY))
+    session = game.sessions[ip2key(client)]
+
+    # Move to adjacent room (repeated moves would be invalid from there)
+    room = ROOMS[session.entities.player][0]
+    outputs = [game.handle_input(client, move_ip(room)) for _ in range(3)]
+    assert outputs[1] == outputs[0] and outputs[2] == outputs[0]
+    assert game.metrics.paths['cached'] == 2
+
+
+def test_cached_probes_charged(tmp_path):
+    """ Probes answered from cache are charged by the rate limiter as well.
+    """
+    game = make_game(tmp_path, limiter=RateLimiter(client_rate=0, client_burst=2))
+    outputs = [game.handle_input('2001:db8::1', game_ip(Input.Game.PLAY)) for _ in range(3)]
+    assert outputs[1] == outputs[0]
+    assert outputs[2] == [output_ip(Output.GAME_EMPTY)]
+
+
+def test_batch_matches_single_probes(tmp_path):
+    """ Batches of probes (with repeated probes) return the same output as probes handled one by one.
+    """
+    # Synthesize games of several clients (moving around at random, with repeated probes)
+    rnd = random.Random(1)
+    clients = [f'2001:db8::{n:x}' for n in range(1, 9)]
+    probes = [(client, game_ip(Input.Game.PLAY), None) for client in clients]
+    for _ in range(200):
+        probe = (rnd.choice(clients), move_ip(rnd.randint(1, len(ROOMS))), None)
+        probes += [probe] * rnd.randint(1, 3)
+
+    # Handle probes one by one and in batches (with the same secret and game numbers)
+    outputs = list()
+    for batch in (None, 16):
+        game = make_game(tmp_path, secret=b'secret')
+        game.cache.timeout = math.inf
+        for client in clients:
+            session = Session(game.log_debug, ip2key(client), game.key)
+            session.game = 0
+            game.sessions.add(ip2key(client), session)
+        if batch is None:
+            outputs.append([game.handle_input(client, target) for client, target, _ in probes])
+        else:
+            outputs.append([output for start in range(0, len(probes), batch)
+                            for output in game.handle_batch(probes[start:start + batch])])
+    assert outputs[1] == outputs[0]
+
+
+def test_batch_repeated_probes_charged(tmp_path):
+    """ Repeated probes of a batch are charged by the rate limiter like single probes.
+    """
+    game = make_game(tmp_path, limiter=RateLimiter(client_rate=0, client_burst=2))
+    outputs = game.handle_batch([('2001:db8::1', game_ip(Input.Game.PLAY), None)] * 3)
+    assert outputs[1] == outputs[0]
+    assert outputs[2] == [output_ip(Output.GAME_EMPTY)]
+
+
+def test_snapshot_round_trip(tmp_path):
+    """ Sessions written by a background snapshot are restored as they were.
+    """
+    # Start games and write snapshot in the background
+    snapshot = str(tmp_path / 'sessions.bin')
+    game = make_game(tmp_path, snapshot=snapshot)
+    clients = [f'2001:db8::{n:x}' for n in range(1, 11)]
+    for client in clients:
+        game.handle_input(client, game_ip(Input.Game.PLAY))
+    game.save_sessions(background=True)
+    game.save_sessions()
+
+    # Restore sessions (in least recently updated order)
+    restored = make_game(tmp_path)
+    assert restored.load_sessions([snapshot]) == len(clients)
+    assert list(restored.sessions) == [ip2key(client) for client in clients]
+    for client in clients:
+        assert restored.sessions[ip2key(client)].pack() == game.sessions[ip2key(client)].pack()
+
+
+def test_snapshot_records_out_of_order(tmp_path):
+    """ Records of snapshots not in least recently updated order are ordered before skipping expired sessions.
+    """
+    # Write snapshot of expired and non-expired sessions in random order
+    now = time.time()
+    ages = [10, GAME_TIMEOUT + 10, 30, GAME_TIMEOUT + 30, 20]
+    records = list()
+    for n, age in enumerate(ages):
+        session = Session(None, ip2key(f'2001:db8::{n + 1:x}'))
+        session.last_update = now - age
+        records.append(session.pack())
+    snapshot = tmp_path / 'sessions.bin'
+    snapshot.write_bytes(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(records)) + b''.join(records))
+
+    # Restore non-expired sessions only (in least recently updated order)
+    game = make_game(tmp_path)
+    assert game.load_sessions([str(snapshot)]) == 3
+    assert list(game.sessions) == [ip2key('2001:db8::3'), ip2key('2001:db8::5'), ip2key('2001:db8::1')]
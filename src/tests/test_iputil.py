@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# Local imports
+from wumpus.const import Input
+from wumpus.game import Game
+from wumpus.iputil import input_ip
+from wumpus.iputil import input_packed
+from wumpus.iputil import ip2key
+from wumpus.iputil import ip2packed
+from wumpus.iputil import key2ip
+from wumpus.iputil import key2packed
+from wumpus.iputil import shoot_ip
+
+
+def test_shoot_hosts_below_offset():
+    """ Shoot hosts with groups below the value offset (decoding to negative actions) are ignored.
+    """
+    assert input_ip('2a06:2906::1') == (None, None)
+    assert input_packed(ip2packed('2a06:2906::1')) == (None, None)
+    assert len(Game().handle_input('2001:db8::1', '2a06:2906::1')) > 0
+
+
+def test_shoot_hosts_out_of_range():
+    """ Shoot hosts beyond the largest valid shot encoding are ignored, valid shots are decoded.
+    """
+    assert input_ip(shoot_ip([20] * 5)) == (Input.Shoot, (20, ) * 5)
+    assert input_ip(shoot_ip([0] * 5 + [1])) == (None, None)
+    assert input_ip('2a06:2906::ffff:ffff:ffff') == (None, None)
+
+
+def test_client_keys():
+    """ Spellings and packed forms of the same address map to the same 16 byte key (IPv4 mapped to IPv6).
+    """
+    key = ip2key('2001:db8::1')
+    assert len(key) == 16
+    assert ip2key('2001:0db8:0:0::0001') == key
+    assert ip2key(ip2packed('2001:db8::1')) == key
+    assert ip2key(memoryview(ip2packed('2001:db8::1'))) == key
+    assert key2ip(key) == '2001:db8::1' and key2packed(key) == ip2packed('2001:db8::1')
+
+    # IPv4 addresses
+    key = ip2key('192.0.2.1')
+    assert key == ip2key('::ffff:192.0.2.1') == ip2key(ip2packed('192.0.2.1'))
+    assert key2ip(key) == '192.0.2.1' and key2packed(key) == ip2packed('192.0.2.1')
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# Local imports
+from wumpus.iputil import ip2packed
+from wumpus.limit import RateLimiter
+
+
+def test_limited_client_keeps_network_budget():
+    """ Probes rejected by the client bucket must not drain the network bucket.
+    """
+    # Exhaust budget of one client
+    limiter = RateLimiter(client_rate=0, client_burst=2, network_rate=0, network_burst=4)
+    greedy = ip2packed('2001:db8::1')
+    assert [limiter.admit(greedy, now=0) for _ in range(10)] == [True, True] + [False] * 8
+
+    # Other clients of the same network are still admitted
+    other = ip2packed('2001:db8::2')
+    assert [limiter.admit(other, now=0) for _ in range(3)] == [True, True, False]
+    assert limiter.limited_probes == 9
+
+
+def test_fresh_sources_share_budget():
+    """ Probes of untracked sources (e.g. random source addresses) are limited by a shared budget of new sources.
+    """
+    # Flood from fresh sources in fresh networks
+    limiter = RateLimiter(source_rate=10, source_burst=5, entries=4)
+    flood = [limiter.admit(ip2packed(f'2001:db8:{n:x}::1'), now=0) for n in range(100)]
+    assert flood == [True] * 5 + [False] * 95
+
+    # Budget of new sources refills, and tracked sources are not charged
+    assert limiter.admit(ip2packed('2001:db8:ffff::1'), now=0.1) is True
+    assert limiter.admit(ip2packed('2001:db8:ffff::2'), now=0.1) is False
+    assert limiter.admit(ip2packed('2001:db8:ffff::1'), now=0.1) is True
+    assert limiter.limited_probes == 96
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import os
+import time
+
+# Local imports
+from wumpus.iputil import ip2key
+from wumpus.score import SCORE_SNAPSHOT_INTERVAL
+from wumpus.score import HighScore
+
+
+def test_top_entries_restored_from_snapshot_and_log(tmp_path):
+    """ Only the best score of the top players is kept, and restored from snapshot and log tail.
+    """
+    # Add scores (improving, worse and beyond top size)
+    path, snapshot = str(tmp_path / 'score.csv'), str(tmp_path / 'score.top.csv')
+    highscore = HighScore(path, snapshot, size=3)
+    assert highscore.add(ip2key('2001:db8::1'), 30.0) is True
+    assert highscore.add(ip2key('2001:db8::2'), 20.0) is True
+    assert highscore.add(ip2key('2001:db8::1'), 40.0) is False
+    assert highscore.add(ip2key('2001:db8::3'), 10.0) is True
+    assert highscore.add(ip2key('2001:db8::4'), 50.0) is False
+    assert highscore.add(ip2key('2001:db8::1'), 5.0) is True
+    top = [(ip2key('2001:db8::1'), 5.0), (ip2key('2001:db8::3'), 10.0), (ip2key('2001:db8::2'), 20.0)]
+    assert highscore.top() == top
+    highscore.close()
+    assert HighScore(path, snapshot, size=3).top() == top
+
+    # Replay log lines appended after the snapshot
+    with open(path, 'a', encoding='utf-8') as fh:
+        fh.write(f'{int(time.time())},2001:db8::5,1.000\n')
+    assert HighScore(path, snapshot, size=3).top() == [(ip2key('2001:db8::5'), 1.0)] + top[:2]
+
+
+def test_snapshot_saved_in_background(tmp_path):
+    """ Periodic snapshots are written by the logger thread, and failing snapshots do not fail adding scores.
+    """
+    # Save snapshot in the background
+    path, snapshot = str(tmp_path / 'score.csv'), str(tmp_path / 'score.top.csv')
+    highscore = HighScore(path, snapshot)
+    highscore.add(ip2key('2001:db8::1'), 30.0, ts=time.time() + SCORE_SNAPSHOT_INTERVAL)
+    highscore.logger.close()
+    assert os.path.isfile(snapshot) is True
+    assert highscore.logger.failed_tasks == 0
+
+    # Count failing snapshots (snapshot directory below a file)
+    highscore = HighScore(path, str(tmp_path / 'score.csv' / 'score.top.csv'))
+    highscore.add(ip2key('2001:db8::2'), 20.0, ts=time.time() + SCORE_SNAPSHOT_INTERVAL)
+    highscore.logger.close()
+    assert highscore.logger.failed_tasks == 1
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import concurrent.futures
+import itertools
+import math
+import random
+import socket
+import struct
+import sys
+
+# Local imports
+from wumpus.const import ROOMS
+from wumpus.const import TRACE_PPH
+from wumpus.const import Input
+from wumpus.game import Game
+from wumpus.iputil import game_ip
+from wumpus.iputil import ip2key
+from wumpus.iputil import ip2packed
+from wumpus.iputil import move_ip
+from wumpus.iputil import shoot_ip
+from wumpus.packet import parse
+from wumpus.score import HighScore
+from wumpus.server import Server
+from wumpus.session import Session
+
+# Stress test dimensions (clients, threads, hops per traceroute run, frames per batch)
+STRESS_CLIENTS = 200
+STRESS_THREADS = 8
+STRESS_HOPS = 8
+STRESS_BATCH = 64
+
+
+def probe_frame(src, dst, hlim, sport=33434):
+    """ Return Ethernet/IPv6/UDP traceroute probe frame with given hop limit.
+    """
+    udp = struct.pack('!HHHH', sport, 33434, 8, 0)
+    ipv6 = struct.pack('!IHBB', 6 << 28, len(udp), socket.IPPROTO_UDP, hlim) + ip2packed(src) + ip2packed(dst)
+    return bytes(12) + b'\x86\xdd' + ipv6 + udp
+
+
+def probe(hlim):
+    """ Return parsed Ethernet/IPv6/UDP traceroute probe with given hop limit.
+    """
+    return parse(probe_frame('2001:db8::1', '2a06:2904::10:10:15', hlim))
+
+
+def stress_commands(n_clients, seed=0):
+    """ Return game commands (targets) of given number of clients, each starting and playing a game.
+    """
+    rnd, commands = random.Random(seed), dict()
+    for n_client in range(n_clients):
+        room = rnd.choice(list(ROOMS))
+        targets = [game_ip(Input.Game.START), game_ip(Input.Game.PLAY)]
+        for _ in range(rnd.randint(2, 8)):
+            room = rnd.choice(ROOMS[room])
+            targets.append(move_ip(room))
+        targets.append(shoot_ip([rnd.choice(ROOMS[room])]))
+        targets.append(game_ip(rnd.choice([Input.Game.HELP, Input.Game.MAP, Input.Game.REPLAY])))
+        commands[f'2001:db8::{n_client + 1:x}'] = targets
+    return commands
+
+
+def stress_game(path, concurrent):
+    """ Return game engine (keeping its highscore in given directory) with a fixed secret and game numbers.
+    """
+    game = Game(highscore=HighScore(str(path / 'score.csv'), str(path / 'score.top.csv')), secret=b'secret',
+                concurrent=concurrent)
+    game.cache.timeout = math.inf
+    return game
+
+
+def start_games(game, clients):
+    """ Add sessions of given clients starting from the same game number (instead of the current time).
+    """
+    for client in clients:
+        session = Session(game.log_debug, ip2key(client), game.key)
+        session.game = 0
+        game.sessions.add(ip2key(client), session)
+
+
+def test_hop_reply_empty_hops():
+    """ Hops without address (e.g. empty highscore entries) are not answered, other hops are.
+    """
+    hops = [ip2packed('2a06:2907::10:10:10'), None, ip2packed('2a06:2907::10:10:11'), None]
+    assert Server.hop_reply(probe(1), hops) is not None
+    assert Server.hop_reply(probe(2), hops) is None
+    assert Server.hop_reply(probe(3), hops) is not None
+    assert Server.hop_reply(probe(4), hops) is None
+    assert Server.hop_reply(probe(64), hops) is None
+
+
+def test_threaded_input_matches_sequential(tmp_path):
+    """ Game engines handling input of clients in several threads return the same output as sequential handling.
+    """
+    commands = stress_commands(STRESS_CLIENTS)
+    clients = list(commands)
+
+    # Handle commands sequentially, then in threads (each thread playing its own share of clients, interleaved)
+    results = list()
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for threads in (None, STRESS_THREADS):
+            game = stress_game(tmp_path / str(threads), threads is not None)
+            start_games(game, clients)
+
+            def play(share):
+                """ Play games of given clients and return their outputs.
+                """
+                outputs = dict()
+                for targets in itertools.zip_longest(*[commands[client] for client in share]):
+                    for client, target in zip(share, targets):
+                        if target is not None:
+                            outputs.setdefault(client, list()).append(game.handle_input(client, target))
+                return outputs
+
+            outputs = dict()
+            if threads is None:
+                outputs.update(play(clients))
+            else:
+                with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+                    for share_outputs in pool.map(play, [clients[n_thread::threads] for n_thread in range(threads)]):
+                        outputs.update(share_outputs)
+            results.append(outputs)
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert results[1] == results[0]
+
+
+def test_threaded_dispatch_matches_sequential(tmp_path):
+    """ Servers handling batches of frames in a thread pool reply the same frames as servers without threads.
+    """
+    # Interleave traceroute runs of clients (TRACE_PPH probes per hop)
+    commands = stress_commands(STRESS_CLIENTS)
+    rnd, runs, frames = random.Random(1), [(client, targets[::-1]) for client, targets in commands.items()], list()
+    while len(runs) > 0:
+        n_run = rnd.randrange(len(runs))
+        client, targets = runs[n_run]
+        target = targets.pop()
+        if len(targets) == 0:
+            runs[n_run] = runs[-1]
+            runs.pop()
+        frames += [probe_frame(client, target, hlim, 33434 + hlim * TRACE_PPH + n_probe)
+                   for hlim in range(1, STRESS_HOPS + 1) for n_probe in range(TRACE_PPH)]
+
+    # Answer frames sequentially, then with a thread pool (replies of a batch may come in any order)
+    results = list()
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for threads in (None, STRESS_THREADS):
+            game = stress_game(tmp_path / str(threads), threads is not None)
+            start_games(game, list(commands))
+            server = Server(game, None, threads=threads)
+            try:
+                results.append([sorted(server.handle_batch(frames[n_frame:n_frame + STRESS_BATCH]))
+                                for n_frame in range(0, len(frames), STRESS_BATCH)])
+            finally:
+                server.close()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert sum(len(replies) for replies in results[0]) == len(frames)
+    assert results[1] == results[0]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# Local imports
+from wumpus.const import ROOMS
+from wumpus.iputil import ip2key
+from wumpus.session import Session
+from wumpus.session import random_key
+
+
+def play(session, moves=20):
+    """ Move along the first tunnels of each room and return the output (stopping once the game is over).
+    """
+    output = list()
+    for _ in range(moves):
+        if session.live is False or session.won is True or session.lost is True:
+            break
+        output += session.move(ROOMS[session.entities.player][0])
+    return output
+
+
+def test_same_state_same_outcome():
+    """ Sessions of the same secret, client and game number draw the same numbers (also when restored from a record).
+    """
+    # Start same game in two sessions
+    client = ip2key('2001:db8::1')
+    first, second = Session(None, client, random_key(b'secret')), Session(None, client, random_key(b'secret'))
+    second.game = first.game
+    first.new()
+    second.new()
+    assert first.initial_entities == second.initial_entities
+
+    # Continue from packed record
+    play(first, 3)
+    play(second, 3)
+    replica = Session.unpack(None, first.pack(), key=random_key(b'secret'))
+    assert [first.draw(1000) for _ in range(5)] == [replica.draw(1000) for _ in range(5)]
+
+
+def test_streams_differ_by_secret_client_and_game():
+    """ Random numbers depend on secret, client and game number.
+    """
+    def draws(secret, client, game):
+        """ Return first numbers drawn by session of given secret, client and game number.
+        """
+        session = Session(None, ip2key(client), random_key(secret))
+        session.game = game
+        return [session.draw(2**32) for _ in range(4)]
+
+    reference = draws(b'secret', '2001:db8::1', 1)
+    assert draws(b'secret', '2001:db8::1', 1) == reference
+    assert draws(b'other', '2001:db8::1', 1) != reference
+    assert draws(b'secret', '2001:db8::2', 1) != reference
+    assert draws(b'secret', '2001:db8::1', 2) != reference
+
+
+def test_replay_repeats_game():
+    """ Replaying a game with the same moves reproduces it, a new game places entities again.
+    """
+    session = Session(None, ip2key('2001:db8::1'), random_key(b'secret'))
+    session.new()
+    entities, output = session.initial_entities, play(session)
+    session.reset()
+    assert session.initial_entities == entities
+    assert play(session) == output
+    game = session.game
+    session.new()
+    assert session.game == game + 1
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import time
+
+# Local imports
+from wumpus.const import GAME_TIMEOUT
+from wumpus.const import ROOMS
+from wumpus.const import Input
+from wumpus.game import Game
+from wumpus.iputil import game_ip
+from wumpus.iputil import ip2key
+from wumpus.iputil import move_ip
+from wumpus.score import HighScore
+from wumpus.session import Session
+from wumpus.shm import SHM_BUCKET_SLOTS
+from wumpus.shm import SharedSessionStore
+
+
+def test_sessions_handed_over(tmp_path):
+    """ Sessions written by one game engine are continued by another one on the same table.
+    """
+    # Start game on first table mapping
+    path = str(tmp_path / 'sessions.shm')
+    highscore = HighScore(str(tmp_path / 'score.csv'), str(tmp_path / 'score.top.csv'))
+    first = Game(highscore=highscore, sessions=SharedSessionStore(path, buckets=16), secret=b'secret')
+    client = ip2key('2001:db8::1')
+    first.handle_input(client, game_ip(Input.Game.PLAY))
+    room = ROOMS[first.sessions[client].entities.player][0]
+
+    # Move on second table mapping
+    second = Game(highscore=highscore, sessions=SharedSessionStore(path), secret=b'secret')
+    assert second.sessions.buckets == 16
+    assert second.sessions[client].pack() == first.sessions[client].pack()
+    second.handle_input(client, move_ip(room))
+    assert first.sessions[client].entities.player == second.sessions[client].entities.player
+    assert first.sessions[client].counter == second.sessions[client].counter
+    first.sessions.close()
+    second.sessions.close()
+
+
+def test_full_bucket_replaces_least_recently_updated(tmp_path):
+    """ Adding to a full bucket replaces its least recently updated session, expired sessions are dropped.
+    """
+    # Fill single bucket (oldest session first)
+    store = SharedSessionStore(str(tmp_path / 'sessions.shm'), buckets=1)
+    clients = [n.to_bytes(16, 'big') for n in range(1, SHM_BUCKET_SLOTS + 2)]
+    for n, client in enumerate(clients):
+        session = Session(None, client)
+        session.last_update = time.time() - (GAME_TIMEOUT + 10 - n if n < SHM_BUCKET_SLOTS else 0)
+        store.add(client, session)
+
+    # Check replaced and expired sessions
+    assert store.evicted == 1
+    assert store.get(clients[0]) is None
+    assert store.touch(clients[1]) is None
+    assert store.touch(clients[-1]) is not None
+    assert store.expire() == SHM_BUCKET_SLOTS - 2
+    assert store.get(clients[-1]) is not None
+    store.close()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import time
+
+# Local imports
+from wumpus.const import GAME_TIMEOUT
+from wumpus.session import Session
+from wumpus.store import SessionStore
+
+
+def make_session(n, age):
+    """ Return session of the n-th client last updated given number of seconds ago.
+    """
+    session = Session(None, n.to_bytes(16, 'big'))
+    session.last_update = time.time() - age
+    return session
+
+
+def test_expire_least_recently_updated():
+    """ Expiry removes the expired sessions at the front, and touched sessions move to the back.
+    """
+    # Add sessions in least recently updated order
+    store = SessionStore()
+    for n, age in enumerate([GAME_TIMEOUT + 20, GAME_TIMEOUT + 10, GAME_TIMEOUT + 5, 10]):
+        store.add(n.to_bytes(16, 'big'), make_session(n, age))
+
+    # Renew an expired session and expire the others
+    assert store.touch((1).to_bytes(16, 'big')) is not None
+    assert store.expire() == 2
+    assert list(store) == [(3).to_bytes(16, 'big'), (1).to_bytes(16, 'big')]
+    assert store.expire() == 0
+    assert store.touch((0).to_bytes(16, 'big')) is None
+
+
+def test_bounded_store_evicts_sessions_without_live_game():
+    """ Adding sessions to a full store evicts the least recently updated session without a live game.
+    """
+    # Fill store (only the oldest session has a live game)
+    store = SessionStore(max_sessions=3)
+    for n in range(3):
+        session = make_session(n, 30 - n)
+        session.live = n == 0
+        store.add(n.to_bytes(16, 'big'), session)
+
+    # Add further sessions
+    store.add((3).to_bytes(16, 'big'), make_session(3, 0))
+    store.add_packed((4).to_bytes(16, 'big'), make_session(4, 0).pack())
+    assert list(store) == [(0).to_bytes(16, 'big'), (3).to_bytes(16, 'big'), (4).to_bytes(16, 'big')]
+    assert store.evicted == 2
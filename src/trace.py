@@ -10,39 +10,97 @@ It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
 Author Johann SCHLAMP <schlamp@leitwert.net>
 """
 
+# System imports
+import argparse
+import multiprocessing
+import sys
+
 # Local imports
-from wumpus.game import Game
-from wumpus.const import FILTER_PREFIX_IPV6
-from wumpus.const import FILTER_PREFIX_IPV4
+from wumpus.aioserver import serve_async
+from wumpus.capture import CAPTURE_BATCH
+from wumpus.const import PROFILE_DIR
+from wumpus.const import PROFILE_RATE
+from wumpus.const import PROFILE_WINDOW
+from wumpus.const import SESSION_SECRET
+from wumpus.const import SESSION_SNAPSHOT
+from wumpus.dns import DNS_PORT
+from wumpus.dns import serve_dns
+from wumpus.limit import RateLimiter
+from wumpus.profiler import Profiler
+from wumpus.server import serve
+from wumpus.server import serve_sharded
+from wumpus.session import load_secret
 
 # Constants
 INTERFACE = "eth0"
 
-# Global game engine
-game = Game(verbose=True, debug=True)
-
-# Sample game input
-src, dst, proto = "2001::1", "2a06:2904::10:10:10", "udp"
-
-# Sample game output
-hops = game.handle_input(src, dst, proto)
-print(f"Sample traceroute from {src} to {dst}:" + "\n -> ".join(hops))
-
-# TODO WWWWWWWWWWWWWW
-# TODO W YOUR TASKS W
-# TODO WWWWWWWWWWWWWW
-# TODO
-# TODO • Capture and print packets for given INTERFACE
-# TODO
-# TODO • Implement ICMP ping for incoming echo requests
-# TODO   —> test with "ping wumpus.quest"
-# TODO
-# TODO • Implement ICMP traceroute for incoming TCP/UDP requests
-# TODO   —> generate response IP addresses with game.handle_input()
-# TODO   —> test with "traceroute wumpus.quest"
-# TODO
-# TODO • Rewrite both routines to support ICMPv6
-# TODO   —> test with "ping6 wumpus.quest"
-# TODO   —> test with "traceroute6 wumpus.quest"
-# TODO
-# TODO • Play the wumpus.quest and have fun :)
+
+def main():
+    """ Answer traceroute probes and pings on given interface.
+    """
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='TRACE_THE_WUMPUS server')
+    parser.add_argument('--interface', default=INTERFACE, help='capture interface')
+    parser.add_argument('--batch', type=int, default=CAPTURE_BATCH, help='frames per receive batch')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (sharded by client address)')
+    parser.add_argument('--asyncio', action='store_true', help='serve on an asyncio event loop')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='handle frames in given number of threads per worker (scaling on free-threaded builds)')
+    parser.add_argument('--logfile', default=None, help='log file')
+    parser.add_argument('--snapshot', default=SESSION_SNAPSHOT, help='session snapshot file (empty to disable)')
+    parser.add_argument('--secret', default=SESSION_SECRET,
+                        help='server secret file deriving game outcomes (created if missing, empty to disable)')
+    parser.add_argument('--sessions-table', default=None,
+                        help='memory-mapped session table handed over between processes (e.g. in /dev/shm)')
+    parser.add_argument('--quiet', action='store_true', help='disable console and debug output')
+    parser.add_argument('--max-sessions', type=int, default=None, help='maximum number of sessions kept in memory')
+    parser.add_argument('--rate-limit', action='store_true', help='limit probes per client/network and new sessions')
+    parser.add_argument('--dns', action='store_true', help='answer PTR queries with names of the built-in screens')
+    parser.add_argument('--dns-names', default=None,
+                        help='answer PTR queries with built-in names replaced by given mapping file (implies --dns)')
+    parser.add_argument('--dns-port', type=int, default=DNS_PORT, help='PTR responder port')
+    parser.add_argument('--metrics', default=None,
+                        help='export Prometheus metrics on <host>:<port> or a Unix socket path (per worker)')
+    parser.add_argument('--profile', action='store_true', help='sample stacks while switched on by SIGUSR2')
+    parser.add_argument('--profile-dir', default=PROFILE_DIR, help='profile output directory')
+    parser.add_argument('--profile-rate', type=int, default=PROFILE_RATE, help='stack samples per second')
+    parser.add_argument('--profile-window', type=int, default=PROFILE_WINDOW, help='maximum seconds per profile')
+    parser.add_argument('--profile-clients', default=None,
+                        help='also profile probes of clients listed in given file (one address per line)')
+    args = parser.parse_args()
+    if args.threads is not None and args.asyncio is True:
+        parser.error('--threads is not supported with --asyncio')
+
+    # Answer PTR queries in a separate process
+    if args.dns is True or args.dns_names is not None:
+        multiprocessing.Process(target=serve_dns, args=(args.dns_names, '::', args.dns_port), name='wumpus-dns',
+                                daemon=True).start()
+
+    # Prepare options
+    options = dict(logfile=args.logfile, verbose=not args.quiet, debug=not args.quiet, snapshot=args.snapshot or None,
+                   sessions_table=args.sessions_table, limiter=RateLimiter() if args.rate_limit is True else None,
+                   max_sessions=args.max_sessions, metrics=args.metrics, secret=None)
+
+    # Load server secret (falling back to the random secret of this process)
+    if args.secret:
+        try:
+            options['secret'] = load_secret(args.secret)
+        except OSError as error:
+            print(f'WARNING: using random secret of this process (failed to load {args.secret}: {error})',
+                  file=sys.stderr)
+
+    # Serve probes
+    if args.profile is True:
+        options['profiler'] = Profiler(args.profile_dir, args.profile_rate, args.profile_window, args.profile_clients)
+    if args.threads is not None:
+        options['threads'] = args.threads
+    if args.asyncio is True:
+        serve_async(args.interface, batch=args.batch, **options)
+    elif args.workers > 1:
+        serve_sharded(args.interface, args.workers, batch=args.batch, **options)
+    else:
+        serve(args.interface, batch=args.batch, **options)
+
+
+if __name__ == '__main__':
+    main()
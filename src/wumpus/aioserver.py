@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import asyncio
+import collections
+import contextlib
+import signal
+import threading
+import time
+
+# Local imports
+from wumpus.capture import Capture
+from wumpus.capture import CAPTURE_BATCH
+from wumpus.game import Game
+from wumpus.server import Server
+from wumpus.shm import SharedSessionStore
+from wumpus.stats import Histogram
+from wumpus.stats import Metrics
+from wumpus.stats import serve_metrics
+
+# Queue defaults
+QUEUE_FRAMES = 4096
+QUEUE_WRITES = 65536
+
+# Statistics interval
+STATS_INTERVAL = 60
+
+
+class AsyncServer:
+    """ Answer traceroute probes on an asyncio event loop.
+
+    Frames are read from the capture socket whenever it becomes readable and queued in a bounded queue (frames are
+    dropped when the queue is full, so a flood of probes sheds load instead of building up latency). Disk writes of
+    the game engine are queued as well and written by a background task in an executor.
+    """
+    def __init__(self, game, capture, queue_frames=QUEUE_FRAMES, queue_writes=QUEUE_WRITES):
+        """ Initialize asyncio server.
+        """
+        # Prepare internals
+        self.game = game
+        self.capture = capture
+        self.server = Server(game, capture)
+        self.frames = asyncio.Queue(maxsize=queue_frames)
+        self.writes = asyncio.Queue(maxsize=queue_writes)
+        self.dropped_frames = 0
+        self.dropped_writes = 0
+        self.stopped = None
+        self.loop = None
+        self.loop_thread = None
+
+        # Prepare per-stage latency histograms
+        self.histograms = collections.OrderedDict((stage, Histogram())
+                                                  for stage in ('queue', 'handle', 'send', 'write'))
+
+        # Pass disk writes of the game engine to the writer task
+        self.game.writer = self.write
+
+    async def run(self, stats_interval=STATS_INTERVAL):
+        """ Serve probes until stopped.
+        """
+        # Register socket reader and signal handlers
+        loop = asyncio.get_event_loop()
+        self.loop, self.loop_thread = loop, threading.get_ident()
+        self.stopped = asyncio.Event()
+        loop.add_reader(self.capture.sock, self.on_readable)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stopped.set)
+
+        # Run handler, writer, checkpoint and statistics tasks until stopped
+        tasks = [loop.create_task(self.handle_frames()), loop.create_task(self.write_lines()),
+                 loop.create_task(self.checkpoint())]
+        if stats_interval is not None:
+            tasks.append(loop.create_task(self.report(stats_interval)))
+        try:
+            await self.stopped.wait()
+        finally:
+            loop.remove_reader(self.capture.sock)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            # Flush pending disk writes
+            self.game.writer = None
+            while self.writes.empty() is False:
+                self.game.write(*self.writes.get_nowait())
+
+    def stop(self):
+        """ Stop serving probes.
+        """
+        if self.stopped is not None:
+            self.stopped.set()
+
+    def on_readable(self):
+        """ Queue received frames (dropping frames if the queue is full).
+        """
+        # Copy frames out of the (reused) capture buffers
+        received = time.perf_counter()
+        for frame in self.capture.recv_batch(0):
+            try:
+                self.frames.put_nowait((received, bytes(frame)))
+            except asyncio.QueueFull:
+                self.dropped_frames += 1
+
+    async def handle_frames(self):
+        """ Handle queued frames in batches and send replies.
+        """
+        # Iterate queued frames
+        batch_size = len(self.capture.buffers)
+        while True:
+            batch = [await self.frames.get()]
+            while len(batch) < batch_size and self.frames.empty() is False:
+                batch.append(self.frames.get_nowait())
+
+            # Handle frames
+            start = time.perf_counter()
+            for received, _ in batch:
+                self.histograms['queue'].add(start - received)
+            replies = self.server.handle_batch([frame for _, frame in batch])
+            handled = time.perf_counter()
+            self.histograms['handle'].add((handled - start) / len(batch))
+
+            # Send replies
+            if len(replies) > 0:
+                self.capture.send_batch(replies)
+                self.histograms['send'].add((time.perf_counter() - handled) / len(replies))
+
+            # Yield to the event loop (socket reader and writer task)
+            await asyncio.sleep(0)
+
+    def write(self, path, line):
+        """ Queue line to be appended to given file (dropping lines if the queue is full).
+
+        Lines written by other threads (e.g. status lines of the profiler) are passed to the event loop thread, as
+        asyncio queues are not thread-safe.
+        """
+        # Queue line in the event loop thread
+        if self.loop is not None and threading.get_ident() != self.loop_thread:
+            try:
+                self.loop.call_soon_threadsafe(self.write, path, line)
+            except RuntimeError:
+                self.dropped_writes += 1
+            return
+
+        # Queue line (or drop it)
+        try:
+            self.writes.put_nowait((path, line))
+        except asyncio.QueueFull:
+            self.dropped_writes += 1
+
+    async def write_lines(self):
+        """ Append queued lines to files in an executor.
+        """
+        # Iterate queued lines
+        loop = asyncio.get_event_loop()
+        while True:
+            lines = [await self.writes.get()]
+            while self.writes.empty() is False:
+                lines.append(self.writes.get_nowait())
+
+            # Write lines without blocking the event loop
+            start = time.perf_counter()
+            await loop.run_in_executor(None, self.append_lines, lines)
+            self.histograms['write'].add(time.perf_counter() - start)
+
+    @staticmethod
+    def append_lines(lines):
+        """ Append (path, line) tuples to files (opening each file once).
+        """
+        # Group lines by file
+        files = collections.OrderedDict()
+        for path, line in lines:
+            files.setdefault(path, list()).append(line + '\n')
+
+        # Append lines
+        for path, file_lines in files.items():
+            with open(path, 'a', encoding='utf-8') as fh:
+                fh.writelines(file_lines)
+
+    async def checkpoint(self):
+        """ Periodically write session snapshots (see Game.checkpoint()).
+        """
+        while True:
+            await asyncio.sleep(1)
+            self.game.checkpoint()
+
+    async def report(self, interval):
+        """ Periodically log latency histograms and drop counters.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            self.game.log_debug(self.stats())
+
+    def stats(self):
+        """ Return latency and drop statistics.
+        """
+        stages = ', '.join(f'{stage}=({histogram.summary()})' for stage, histogram in self.histograms.items())
+        return f'STATS [{stages}, dropped_frames={self.dropped_frames}, dropped_writes={self.dropped_writes}]'
+
+
+###########
+# SERVING #
+###########
+
+def serve_async(interface, batch=CAPTURE_BATCH, queue_frames=QUEUE_FRAMES, sessions_table=None, metrics=None,
+                profiler=None, **options):
+    """ Serve probes on given interface using an asyncio event loop (optionally on a shared session table).
+
+    Metrics are optionally exported on a given address (see stats.serve_metrics()). A given profiler is switched on
+    and off by SIGUSR2 (see profiler.Profiler).
+    """
+    # Prepare game engine (restoring sessions unless kept in a shared session table) and server
+    if sessions_table is not None:
+        options.update(sessions=SharedSessionStore(sessions_table), snapshot=None)
+    game = Game(metrics=Metrics() if metrics is not None else None, **options)
+    if game.snapshot is not None:
+        game.load_sessions([game.snapshot])
+    if metrics is not None:
+        serve_metrics(metrics, game.export_metrics)
+    if profiler is not None:
+        profiler.install(game)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    server = AsyncServer(game, Capture(interface, batch=batch), queue_frames=queue_frames)
+
+    # Serve until stopped (running each shutdown step even if an earlier one fails)
+    try:
+        loop.run_until_complete(server.run())
+    finally:
+        with contextlib.ExitStack() as stack:
+            stack.callback(loop.close)
+            stack.callback(game.highscore.close)
+            stack.callback(game.logger.close)
+            if game.snapshot is not None:
+                stack.callback(game.save_sessions)
+            game.log_debug(server.stats())
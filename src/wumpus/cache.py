@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+Author Leonhard RABEL <rabel@leitwert.net>
+"""
+
+# System imports
+import collections
+import time
+
+# Local imports
+from wumpus.const import TRACE_PPH
+from wumpus.const import TRACE_TIMEOUT
+from wumpus.store import NO_LOCK
+
+
+class ProbeCache:
+    """ Keep track of hop lists computed for recent traceroute probes.
+
+    A single traceroute run sends TRACE_PPH probes per hop towards the same target. Only the first probe of a run is
+    handled by the game engine, all remaining probes are answered from this cache. Entries expire TRACE_TIMEOUT
+    seconds after their last use. Once all probes expected for a run have been answered, entries are no longer renewed
+    (but still answer late probes until they expire).
+    """
+    def __init__(self, timeout=TRACE_TIMEOUT, pph=TRACE_PPH, lock=None):
+        """ Initialize probe cache (guarded by given reentrant lock if shared between threads).
+        """
+        # Prepare internals
+        self.timeout = timeout
+        self.pph = pph
+        self.lock = lock if lock is not None else NO_LOCK
+        self.entries = collections.OrderedDict()
+
+    def get(self, key, now=None, uses=1):
+        """ Return cached output for given key (or None if missing or expired), counting given number of probes.
+        """
+        with self.lock:
+            # Clear expired entries
+            now = time.time() if now is None else now
+            self.expire(now)
+
+            # Access cache entry
+            entry = self.entries.get(key, None)
+            if entry is None:
+                return None
+
+            # Renew entry for remaining probes of the current run
+            entry[1] -= uses
+            if entry[1] > 0:
+                entry[0] = now
+                self.entries.move_to_end(key)
+
+            # Return cached output
+            return entry[2]
+
+    def put(self, key, output, now=None):
+        """ Store output for given key.
+        """
+        # Expect TRACE_PPH probes per hop (including the current one)
+        now = time.time() if now is None else now
+        with self.lock:
+            self.entries[key] = [now, self.pph * len(output) - 1, output]
+            self.entries.move_to_end(key)
+
+    def expire(self, now=None):
+        """ Remove expired entries (oldest first).
+        """
+        # Entries are ordered by last use
+        now = time.time() if now is None else now
+        with self.lock:
+            while len(self.entries) > 0:
+                key, entry = next(iter(self.entries.items()))
+                if now - entry[0] < self.timeout:
+                    break
+                del self.entries[key]
+
+    def __len__(self):
+        """ Return number of cached entries.
+        """
+        return len(self.entries)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import ctypes
+import select
+import socket
+import struct
+
+# Local imports
+from wumpus.const import FILTER_PREFIX_IPV6
+from wumpus.const import FILTER_PREFIX_IPV4
+from wumpus.iputil import IPV4_MAPPED_PREFIX
+from wumpus.packet import ETH_P_IP
+from wumpus.packet import ETH_P_IPV6
+
+# Socket constants
+ETH_P_ALL = 0x0003
+SOL_PACKET = 263
+SO_ATTACH_FILTER = 26
+PACKET_OUTGOING = 4
+PACKET_FANOUT = 18
+PACKET_FANOUT_DATA = 22
+PACKET_FANOUT_CBPF = 6
+
+# BPF instructions
+BPF_LD_H_ABS = 0x28
+BPF_LD_W_ABS = 0x20
+BPF_LD_B_ABS = 0x30
+BPF_ALU_AND_K = 0x54
+BPF_ALU_RSH_K = 0x74
+BPF_ALU_XOR_X = 0xac
+BPF_ALU_MOD_K = 0x94
+BPF_MISC_TAX = 0x07
+BPF_JMP_JA = 0x05
+BPF_JMP_JEQ_K = 0x15
+BPF_RET_K = 0x06
+BPF_RET_A = 0x16
+
+# Capture defaults
+CAPTURE_BATCH = 64
+CAPTURE_SNAPLEN = 2048
+
+
+class Capture:
+    """ Capture and send Ethernet frames on a raw AF_PACKET socket.
+
+    Frames are received in batches: after the socket becomes readable, all pending frames (up to <batch>) are drained
+    into preallocated buffers without blocking. Replies are sent in batches as well.
+    """
+    def __init__(self, interface=None, batch=CAPTURE_BATCH, snaplen=CAPTURE_SNAPLEN, sock=None, fanout=None):
+        """ Initialize capture (on given interface or given socket).
+
+        With <fanout> given as (group ID, number of shards), the socket joins a fanout group that steers frames to
+        shards by client address (see shard_index()).
+        """
+        # Open raw socket and attach prefix filter
+        if sock is None:
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+            attach_filter(sock, bpf_filter(FILTER_PREFIX_IPV6, FILTER_PREFIX_IPV4, snaplen))
+            sock.bind((interface, 0))
+
+            # Join fanout group
+            if fanout is not None:
+                group_id, n_shards = fanout
+                sock.setsockopt(SOL_PACKET, PACKET_FANOUT, (group_id & 0xffff) | (PACKET_FANOUT_CBPF << 16))
+                attach_filter(sock, bpf_fanout(n_shards), SOL_PACKET, PACKET_FANOUT_DATA)
+        sock.setblocking(False)
+
+        # Prepare internals
+        self.sock = sock
+        self.buffers = [bytearray(snaplen) for _ in range(batch)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+
+    def recv_batch(self, timeout=None):
+        """ Receive batch of frames (as memoryviews, valid until the next call).
+        """
+        # Wait for pending frames
+        if len(select.select([self.sock], [], [], timeout)[0]) == 0:
+            return list()
+
+        # Drain pending frames
+        frames = list()
+        for view in self.views:
+            try:
+                n_bytes, address = self.sock.recvfrom_into(view)
+            except (BlockingIOError, InterruptedError):
+                break
+
+            # Skip own outgoing frames
+            if isinstance(address, tuple) is True and len(address) > 2 and address[2] == PACKET_OUTGOING:
+                continue
+            frames.append(view[:n_bytes])
+
+        # Return received frames
+        return frames
+
+    def send_batch(self, frames):
+        """ Send batch of frames.
+        """
+        # Send frames (dropping frames if socket buffer is full)
+        n_sent = 0
+        for frame in frames:
+            try:
+                self.sock.send(frame)
+                n_sent += 1
+            except (BlockingIOError, InterruptedError):
+                break
+        return n_sent
+
+    def close(self):
+        """ Close capture socket.
+        """
+        self.sock.close()
+
+
+##############
+# BPF FILTER #
+##############
+
+def bpf_filter(prefix6, prefix4, snaplen=CAPTURE_SNAPLEN):
+    """ Compile classic BPF program accepting frames towards given IPv6 (up to /32) and IPv4 prefixes.
+    """
+    # Split prefixes into network and mask
+    net6, mask6 = bpf_prefix(prefix6, socket.AF_INET6)
+    net4, mask4 = bpf_prefix(prefix4, socket.AF_INET)
+
+    # Match Ethernet type and destination address
+    return [
+        (BPF_LD_H_ABS, 0, 0, 12),
+        (BPF_JMP_JEQ_K, 0, 3, ETH_P_IPV6),
+        (BPF_LD_W_ABS, 0, 0, 14 + 24),
+        (BPF_ALU_AND_K, 0, 0, mask6),
+        (BPF_JMP_JEQ_K, 4, 5, net6),
+        (BPF_JMP_JEQ_K, 0, 4, ETH_P_IP),
+        (BPF_LD_W_ABS, 0, 0, 14 + 16),
+        (BPF_ALU_AND_K, 0, 0, mask4),
+        (BPF_JMP_JEQ_K, 0, 1, net4),
+        (BPF_RET_K, 0, 0, snaplen),
+        (BPF_RET_K, 0, 0, 0),
+    ]
+
+
+def bpf_fanout(n_shards):
+    """ Compile classic BPF fanout program selecting shard by client (source) address.
+
+    Fanout programs see received frames from the network header on (without Ethernet header), so the address family
+    is taken from the IP version nibble.
+    """
+    # Hash last two IPv6 address words (or IPv4 address) modulo number of shards
+    return [
+        (BPF_LD_B_ABS, 0, 0, 0),
+        (BPF_ALU_RSH_K, 0, 0, 4),
+        (BPF_JMP_JEQ_K, 0, 5, 6),
+        (BPF_LD_W_ABS, 0, 0, 8 + 8),
+        (BPF_MISC_TAX, 0, 0, 0),
+        (BPF_LD_W_ABS, 0, 0, 8 + 12),
+        (BPF_ALU_XOR_X, 0, 0, 0),
+        (BPF_JMP_JA, 0, 0, 1),
+        (BPF_LD_W_ABS, 0, 0, 12),
+        (BPF_ALU_MOD_K, 0, 0, n_shards),
+        (BPF_RET_A, 0, 0, 0),
+    ]
+
+
+def shard_index(client, n_shards):
+    """ Return shard of given packed client address (matching bpf_fanout()).
+    """
+    if len(client) == 16 and client[:12] == IPV4_MAPPED_PREFIX:
+        client = client[12:]
+    if len(client) == 16:
+        return (int.from_bytes(client[8:12], 'big') ^ int.from_bytes(client[12:16], 'big')) % n_shards
+    return int.from_bytes(client, 'big') % n_shards
+
+
+def bpf_prefix(prefix, family):
+    """ Convert prefix to leading 32 bit network and mask.
+    """
+    # Parse prefix
+    ip, length = prefix.split('/', 1)
+    length = int(length)
+    if length > 32:
+        raise ValueError(f'unsupported filter prefix length: {prefix}')
+
+    # Return network and mask of first address word
+    mask = (0xffffffff << (32 - length)) & 0xffffffff
+    return struct.unpack('!I', socket.inet_pton(family, ip)[:4])[0] & mask, mask
+
+
+def attach_filter(sock, program, level=socket.SOL_SOCKET, option=SO_ATTACH_FILTER):
+    """ Attach classic BPF program to given socket (as socket filter by default).
+    """
+    # Prepare struct sock_fprog (the kernel copies the program)
+    code = ctypes.create_string_buffer(b''.join(struct.pack('HBBI', *insn) for insn in program))
+    fprog = struct.pack('HL', len(program), ctypes.addressof(code))
+    sock.setsockopt(level, option, fprog)
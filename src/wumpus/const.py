@@ -26,6 +26,9 @@ TRACE_TARGET_IPV4 = '194.145.125.135'
 # Packets per hop
 TRACE_PPH = 3
 
+# Maximum hops per traceroute
+TRACE_MAX_HOPS = 30
+
 # Expiry timeout
 TRACE_TIMEOUT = 1
 GAME_TIMEOUT = 300
@@ -33,6 +36,19 @@ GAME_TIMEOUT = 300
 # Highscore entries
 MAX_HIGHSCORE = 10
 CSV_HIGHSCORE = '/srv/wumpus/data/score.csv'
+CSV_HIGHSCORE_TOP = '/srv/wumpus/data/score.top.csv'
+
+# Session snapshots
+SESSION_SNAPSHOT = '/srv/wumpus/data/sessions.bin'
+SNAPSHOT_INTERVAL = 60
+
+# Server secret (deriving random numbers of sessions)
+SESSION_SECRET = '/srv/wumpus/data/secret.bin'
+
+# Profiles (output directory, sampling rate in Hz, sampling window in seconds)
+PROFILE_DIR = '/srv/wumpus/data/profiles'
+PROFILE_RATE = 100
+PROFILE_WINDOW = 30
 
 # Game board
 ROOMS = {
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import select
+import signal
+import socket
+import struct
+import sys
+
+# Local imports
+from wumpus.const import ROOMS
+from wumpus.const import TRACE_PREFIX_GAME
+from wumpus.const import TRACE_PREFIX_MOVE
+from wumpus.const import TRACE_PREFIX_OUTPUT
+from wumpus.const import TRACE_PREFIX_SHOOT
+from wumpus.const import Input
+from wumpus.const import Output
+from wumpus.iputil import cidr2rdns
+from wumpus.iputil import game_ip
+from wumpus.iputil import move_ip
+from wumpus.iputil import output_ip
+
+# Responder defaults
+DNS_PORT = 53
+DNS_TTL = 3600
+DNS_BATCH = 64
+DNS_MAX_QUERY = 512
+
+# Domain of built-in names (see default_names())
+DNS_DOMAIN = 'wumpus.quest'
+
+# Cached responses (cleared when exceeded)
+DNS_CACHE_ENTRIES = 2**16
+
+# Record types and classes
+TYPE_PTR = 12
+TYPE_ANY = 255
+CLASS_IN = 1
+
+# Response flags (QR and AA set, recursion not available) and codes
+FLAGS_RESPONSE = 0x84
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+
+# Section counts (one question with or without one answer)
+COUNTS_ANSWER = struct.pack('!HHHH', 1, 1, 0, 0)
+COUNTS_EMPTY = struct.pack('!HHHH', 1, 0, 0, 0)
+
+# Reverse zones and name builders of name mapping sections
+ZONES = {
+    'game': (cidr2rdns(TRACE_PREFIX_GAME), lambda action: game_ip(action, fwd=False)),
+    'move': (cidr2rdns(TRACE_PREFIX_MOVE), lambda room: move_ip(room, fwd=False)),
+    'output': (cidr2rdns(TRACE_PREFIX_OUTPUT), lambda oid: output_ip(oid, fwd=False)),
+}
+ZONE_SHOOT = cidr2rdns(TRACE_PREFIX_SHOOT)
+
+
+class PtrResponder:
+    """ Answer PTR queries for the reverse zones of the game prefixes.
+
+    Answer records of all named game, move and output addresses are precomputed (the address space in use is tiny),
+    and complete responses are cached by question, so answering a query takes a dictionary lookup and patching the
+    query ID into the cached response. Unknown names within the zones are answered with NXDOMAIN, any other names are
+    refused.
+    """
+    def __init__(self, names, sock, batch=DNS_BATCH, ttl=DNS_TTL):
+        """ Initialize responder with given {(section, ID): name} mapping (see default_names() and load_names()).
+        """
+        # Prepare internals
+        self.sock = sock
+        self.batch = batch
+        self.running = False
+        self.responses = dict()
+
+        # Precompute answer records by query name
+        self.answers = dict()
+        for (section, value), name in names.items():
+            zone, rdns = ZONES[section]
+            self.answers[encode_name(f'{rdns(value)}.{zone}')] = answer_record(name, ttl)
+
+        # Prepare zone suffixes
+        self.zones = tuple(encode_name(zone) for zone in [zone for zone, _ in ZONES.values()] + [ZONE_SHOOT])
+
+    def run(self, timeout=1.0):
+        """ Receive and answer queries until stopped.
+        """
+        # Wait for queries and answer them in batches
+        self.running = True
+        while self.running is True:
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if len(readable) == 0:
+                continue
+            for response, address in self.handle_batch(self.recv_batch()):
+                try:
+                    self.sock.sendto(response, address)
+                except OSError:
+                    continue
+
+    def stop(self):
+        """ Stop responder loop.
+        """
+        self.running = False
+
+    def recv_batch(self):
+        """ Receive pending queries (up to batch size) without blocking.
+        """
+        queries = list()
+        while len(queries) < self.batch:
+            try:
+                queries.append(self.sock.recvfrom(DNS_MAX_QUERY, socket.MSG_DONTWAIT))
+            except (BlockingIOError, InterruptedError):
+                break
+        return queries
+
+    def handle_batch(self, queries):
+        """ Handle batch of (query, address) tuples and return (response, address) tuples.
+        """
+        responses = list()
+        for query, address in queries:
+            response = self.handle_query(query)
+            if response is not None:
+                responses.append((response, address))
+        return responses
+
+    def handle_query(self, query):
+        """ Return response to given query (or None for anything but a standard query with one question).
+        """
+        # Ignore responses, other opcodes and malformed queries
+        if len(query) < 17 or query[2] & 0xf8 != 0 or query[4:6] != b'\x00\x01':
+            return None
+        end = query.find(b'\x00', 12) + 5
+        if end < 17 or end > len(query):
+            return None
+
+        # Lookup cached response by question (and recursion desired flag)
+        key = query[2:3] + query[12:end]
+        response = self.responses.get(key, None)
+        if response is None:
+            response = self.respond(query[2] & 0x01, query[12:end])
+            if len(self.responses) >= DNS_CACHE_ENTRIES:
+                self.responses.clear()
+            self.responses[key] = response
+
+        # Patch query ID into response
+        return query[:2] + response
+
+    def respond(self, recursion, question):
+        """ Prepare response (without ID) to given question.
+        """
+        # Answer PTR (or ANY) queries for known names (and empty answers for other types)
+        qname = question[:-4].lower()
+        qtype, qclass = struct.unpack('!HH', question[-4:])
+        answer = self.answers.get(qname, None)
+        if answer is not None:
+            if qtype in {TYPE_PTR, TYPE_ANY} and qclass == CLASS_IN:
+                return bytes((FLAGS_RESPONSE | recursion, RCODE_NOERROR)) + COUNTS_ANSWER + question + answer
+            return bytes((FLAGS_RESPONSE | recursion, RCODE_NOERROR)) + COUNTS_EMPTY + question
+
+        # Deny unknown names within zones and refuse other names
+        rcode = RCODE_NXDOMAIN if qname.endswith(self.zones) is True else RCODE_REFUSED
+        return bytes((FLAGS_RESPONSE | recursion, rcode)) + COUNTS_EMPTY + question
+
+
+###########
+# HELPERS #
+###########
+
+def encode_name(name):
+    """ Encode domain name in (lowercase) wire format.
+    """
+    # Encode labels
+    wire = bytearray()
+    for label in name.rstrip('.').lower().split('.'):
+        label = label.encode('ascii')
+        if len(label) < 1 or len(label) > 63:
+            raise ValueError(f'invalid domain name: {name}')
+        wire.append(len(label))
+        wire += label
+    wire.append(0)
+    return bytes(wire)
+
+
+def answer_record(name, ttl):
+    """ Encode PTR answer record to given name (referring to the question name).
+    """
+    rdata = encode_name(name)
+    return struct.pack('!HHHIH', 0xc00c, TYPE_PTR, CLASS_IN, ttl, len(rdata)) + rdata
+
+
+def default_names(domain=DNS_DOMAIN):
+    """ Return {(section, ID): name} mapping naming game actions, rooms and output lines of the built-in screens.
+
+    Game actions are named by their command (e.g. 'play.<domain>'), rooms by number (e.g. 'room-5.<domain>') and
+    output lines by their text constant, numbered within multi-line screens (e.g. 'info-title-1.<domain>').
+    """
+    # Name game actions and rooms
+    names = dict()
+    for attr, action in vars(Input.Game).items():
+        if attr.isupper() is True and action >= 0:
+            names[('game', action)] = f'{attr.lower()}.{domain}'
+    for room in ROOMS:
+        names[('move', room)] = f'room-{room}.{domain}'
+
+    # Name output lines (skipping the IPv4 fallback, which is answered from IPv4 addresses)
+    for attr, oids in vars(Output).items():
+        label = attr.lower().replace('_', '-')
+        if isinstance(oids, int) is True:
+            names[('output', oids)] = f'{label}.{domain}'
+        elif attr.isupper() is True and all(isinstance(oid, int) for oid in oids) is True:
+            names.update((('output', oid), f'{label}-{n_line}.{domain}') for n_line, oid in enumerate(oids, 1))
+    return names
+
+
+def load_names(path):
+    """ Load {(section, ID): name} mapping from file with '<section> <ID> <name>' lines.
+
+    Sections are 'game' (with game actions as IDs), 'move' (with rooms) and 'output' (with output text IDs).
+    """
+    # Parse lines (skipping empty lines and comments)
+    names = dict()
+    with open(path, 'r', encoding='utf-8') as fh:
+        for line in fh:
+            line = line.split('#', 1)[0].strip()
+            if len(line) == 0:
+                continue
+            section, value, name = line.split()
+            if section not in ZONES:
+                raise ValueError(f'invalid name section: {section}')
+            names[(section, int(value))] = name
+    return names
+
+
+###########
+# SERVING #
+###########
+
+def serve_dns(names_path=None, address='::', port=DNS_PORT, batch=DNS_BATCH):
+    """ Answer PTR queries on given address and port.
+
+    Names of the built-in screens are answered by default (see default_names()), and replaced or extended by names
+    of an optional mapping file (see load_names()).
+    """
+    # Collect names
+    names = default_names()
+    if names_path is not None:
+        names.update(load_names(names_path))
+
+    # Prepare socket and responder
+    sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+    sock.bind((address, port))
+    responder = PtrResponder(names, sock, batch=batch)
+
+    # Serve until interrupted or terminated
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        responder.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
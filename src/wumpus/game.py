@@ -11,152 +11,271 @@ Author Leonhard RABEL <rabel@leitwert.net>
 """
 
 # System imports
-import datetime
+import bisect
+import collections
+import itertools
+import operator
 import os
+import struct
+import threading
+import time
 
 # Local imports
+from wumpus.cache import ProbeCache
+from wumpus.capture import shard_index
+from wumpus.const import GAME_TIMEOUT
+from wumpus.const import TRACE_TARGET_IPV4
 from wumpus.const import Input
 from wumpus.const import Output
 from wumpus.iputil import input_ip
+from wumpus.iputil import input_packed
 from wumpus.iputil import output_ip
+from wumpus.iputil import output_packed
+from wumpus.iputil import game_ip
+from wumpus.iputil import ip2key
+from wumpus.iputil import ip2packed
+from wumpus.iputil import key2ip
+from wumpus.iputil import key2packed
+from wumpus.iputil import packed2ip
+from wumpus.log import Logger
+from wumpus.log import timestamp
+from wumpus.score import HighScore
 from wumpus.session import Session
+from wumpus.session import SESSION_RECORD
+from wumpus.session import random_key
+from wumpus.store import SessionStore
+from wumpus.store import STORE_LOCK_STRIPES
 from wumpus.const import MAX_HIGHSCORE
-from wumpus.const import CSV_HIGHSCORE
+from wumpus.const import SNAPSHOT_INTERVAL
+
+# Session snapshot header (magic, number of records)
+SNAPSHOT_MAGIC = b'WUMPUS\x00\x02'
+SNAPSHOT_HEADER = struct.Struct('<8sQ')
+
+# Game actions depending on a client session (sessions are not initialized for any other input)
+SESSION_ACTIONS = {Input.Game.PLAY, Input.Game.HELP}
+
+# Fields of packed session records (whole record, client key and last update, each spanning a whole record)
+RECORD_BYTES = struct.Struct(f'<{SESSION_RECORD.size}s')
+RECORD_CLIENT = struct.Struct(f'<16s{SESSION_RECORD.size - 16}x')
+RECORD_LAST_UPDATE = struct.Struct(f'<{SESSION_RECORD.size - 8}xd')
 
 
 class Game:
     """ Game instance.
     """
-    def __init__(self, logfile=None, verbose=False, debug=False):
-        """ Initialize game.
+    def __init__(self, logfile=None, verbose=False, debug=False, highscore=None, logger=None, snapshot=None,
+                 sessions=None, limiter=None, max_sessions=None, metrics=None, secret=None, concurrent=False):
+        """ Initialize game (optionally sharing a given highscore or session store with other game instances).
+
+        Without a given session store, sessions are kept in memory (limited to <max_sessions> if given).
+
+        Probes are optionally subject to admission control by a given rate limiter (see limit.RateLimiter), and counted
+        by given metrics (see stats.Metrics).
+
+        Game outcomes are derived from the given server secret (see Session.draw()), so game instances sharing the
+        secret answer the same commands of the same session state alike. Without a secret, a random secret of the
+        process is used.
+
+        If <concurrent>, input may be handled by several threads at once: sessions are guarded by striped per-client
+        locks (see SessionStore.lock()), the probe cache by its own lock, and the highscore (and rate limiter) lock
+        themselves. Probes of the same client are still best handled by a single thread in order. Sessions are guarded
+        by per-client locks with a <snapshot> file as well, as snapshots are written by a background thread.
         """
         # Prepare internals
-        self.sessions = dict()
-        self.highscore = dict()
+        self.key = random_key(secret) if secret is not None else None
+        self.sessions = sessions if sessions is not None else SessionStore(
+            max_sessions=max_sessions,
+            stripes=STORE_LOCK_STRIPES if concurrent is True or snapshot is not None else None)
+        self.sessions.log = self.log_debug
+        self.sessions.key = self.key
+        self.highscore = highscore if highscore is not None else HighScore()
+        self.cache = ProbeCache(lock=threading.RLock() if concurrent is True else None)
         self.logfile = logfile
         self.verbose = verbose
         self.debug = debug
-        self.error = False
-
-        # Load highscore
-        if os.path.isfile(CSV_HIGHSCORE) is True:
-            with open(CSV_HIGHSCORE, 'r', encoding='utf-8') as fh:
-                for line in fh:
-                    _, player, duration = line.strip().split(',')
-                    duration = float(duration)
-                    if duration <= self.highscore.get(player, duration):
-                        self.highscore[player] = duration
-
-    def handle_input(self, client, target, proto=None, add_delays=False):
-        """ Handle game input represented by <target> for player identified by <client>.
+        self.writer = None
+        self.logger = logger if logger is not None else Logger()
+        self.snapshot = snapshot
+        self.snapshot_thread = None
+        self.last_snapshot = time.time()
+        self.limiter = limiter
+        self.metrics = metrics
+        self.tracer = None
+        self.score = (None, None)
+        self.score_screens = dict()
+
+    def handle_batch(self, probes, add_delays=False, packed=False):
+        """ Handle batch of (client, target, proto) probes and return output messages of each probe (in given order).
+
+        Expired sessions are cleared once per batch. Probes are handled grouped by client (clients in order of their
+        first probe, probes of each client in given order), and repeated probes of a client to the same target (e.g.
+        the probes of a traceroute run) are handled once: they share the output list of their first probe (and are
+        counted as answered from cache, see handle_input()). Repeated probes are charged by the rate limiter as well.
         """
-        # Reset error
-        self.error = False
-
-        def handle():
-            """ Generate output message(s) for given input command.
-            """
-            # Clear expired sessions
-            for player in list(self.sessions):
-                if self.sessions[player].expired() is True:
-                    del self.sessions[player]
-
-            # Access or initialize client session
-            session = self.sessions.get(client, None)
-            if session is None:
-                session = Session(self.log_debug, client)
-                self.sessions[client] = session
+        # Group probes by client and target (keeping their positions)
+        clients = collections.OrderedDict()
+        for slot, (client, target, proto) in enumerate(probes):
+            targets = clients.setdefault(ip2key(client), collections.OrderedDict())
+            target = bytes(target) if packed is True else target
+            repeats = targets.get(target, None)
+            if repeats is None:
+                targets[target] = (proto, [slot])
+            else:
+                repeats[1].append(slot)
+
+        # Clear expired sessions
+        n_expired = self.sessions.expire()
+        if self.metrics is not None:
+            self.metrics.sessions_expired += n_expired
+
+        # Handle first probe of each client and target (sharing its output with repeated probes within budget)
+        render_ip = output_packed if packed is True else output_ip
+        outputs = [None] * sum(len(slots) for targets in clients.values() for _, slots in targets.values())
+        for client, targets in clients.items():
+            for target, (proto, slots) in targets.items():
+                output = self.handle_input(client, target, proto, add_delays, packed, expire=False)
+                outputs[slots[0]] = output
+                n_repeated = 0
+                for slot in slots[1:]:
+                    if self.limiter is not None and self.limiter.admit(client) is False:
+                        if self.metrics is not None:
+                            self.metrics.paths['limited'] += 1
+                        outputs[slot] = self.output_limited(render_ip, add_delays)
+                        continue
+                    outputs[slot] = output
+                    n_repeated += 1
+                if n_repeated > 0:
+                    self.cache.get((client, target), uses=n_repeated)
+                    if self.metrics is not None:
+                        self.metrics.paths['repeated'] += n_repeated
+
+        # Return output messages by position
+        return outputs
+
+    def handle_input(self, client, target, proto=None, add_delays=False, packed=False, expire=True):
+        """ Handle game input represented by <target> for player identified by <client>.
 
-            # Renew timeout of client session
-            self.sessions[client].update()
+        The client is given as address string or packed address bytes and identified by its 16 byte key (see
+        iputil.ip2key()), so different spellings of the same address share a session.
 
-            # Parse target details
-            cmd, action = input_ip(target)
+        In packed mode, <target> is given as raw address bytes (16 bytes for IPv6, 4 bytes for IPv4, e.g. a memoryview
+        on a captured frame) and output addresses are returned as raw bytes as well.
 
+        Expired sessions are cleared before handling input (unless done by the caller, see handle_batch()).
+        """
+        # Select address representation
+        parse_ip, render_ip = input_ip, output_ip
+        if packed is True:
+            parse_ip, render_ip = input_packed, output_packed
+            target = bytes(target)
+
+        # Normalize client to 16 byte key
+        client = ip2key(client)
+        metrics = self.metrics
+
+        # Profile probes of traced clients (see profiler.ClientTracer)
+        if self.tracer is not None and self.tracer.traces(client) is True:
+            return self.tracer.run(self.handle_input, client, target, proto, add_delays, packed, expire)
+
+        # Answer probes over budget with a static reply (before any other work)
+        if self.limiter is not None and self.limiter.admit(client) is False:
+            if metrics is not None:
+                metrics.paths['limited'] += 1
+            return self.output_limited(render_ip, add_delays)
+
+        # Answer static screens from precomputed hop lists (unless the client has a session these screens reset)
+        screen = STATIC_SCREENS.get(target, None)
+        if screen is None and target in SCORE_TARGETS:
+            screen = self.score_screen(target, render_ip)
+        if screen is not None and client not in self.sessions:
+            if self.debug is True:
+                self.log_command(client, target, proto, packed, *parse_ip(target))
+            if metrics is not None:
+                metrics.paths['static'] += 1
+            return list(screen[0] if add_delays is False else screen[1])
+
+        # Answer repeated probes of the same traceroute run from cache
+        output_ips = self.cache.get((client, target))
+        if output_ips is not None:
+            with self.sessions.lock(client):
+                self.sessions.touch(client)
+            if metrics is not None:
+                metrics.paths['cached'] += 1
+            if add_delays is False:
+                return [oip[0] for oip in output_ips]
+            return list(output_ips)
+
+        def handle(session, cmd, action):
+            """ Generate output message(s) for given input command (with client session if any) and error status.
+            """
             # Output debug message
             if self.debug is True:
-                cmd_str = cmd.__name__.lower() if cmd is not None else '?'
-                action_str = str(action) if action is not None else '?'
-                proto_str = str(proto) if proto is not None else '?'
-                self.log_debug(f'CMD [client={client}, target={target}, proto={proto_str}, cmd={cmd_str}, '
-                               f'action={action_str}]')
+                self.log_command(client, target, proto, packed, cmd, action)
 
             # Handle game commands
             if cmd == Input.Game:
 
                 # Display IPv4 fallback
                 if action == Input.Game.IPV4:
-                    return session.output_ipv4()
+                    return Session.output_ipv4(), False
 
                 # Display help
                 if action == Input.Game.HELP:
-                    return session.output_help()
-                session.last_help = -1
+                    return session.output_help(), False
+                if session is not None:
+                    session.last_help = -1
 
                 # Display map
                 if action == Input.Game.MAP:
-                    return session.output_map()
+                    return Session.output_map(), False
 
                 # Show high score
                 if action == Input.Game.SCORE:
-                    output = session.output_score()
-
-                    # Add top players
-                    last_duration = 0
-                    for player, duration in sorted(self.highscore.items(), key=lambda item: item[1])[:MAX_HIGHSCORE]:
-                        output.append((player, duration - last_duration))
-                        last_duration = duration
-                    if len(self.highscore) < MAX_HIGHSCORE:
-                        output += [(None, None)] * (MAX_HIGHSCORE - len(self.highscore))
-
-                    # Add footer and return output
-                    output.append(Output.GAME_EMPTY)
-                    output.append(Output.GAME_PLAY)
-                    return output
+                    return self.output_score(), False
 
                 # Welcome new player
                 if action == Input.Game.START:
-                    session.clear()
-                    return session.output_title()
+                    if session is not None:
+                        session.clear()
+                    return Session.output_title(), False
 
                 # Start new game
                 if action == Input.Game.PLAY:
                     session.new()
-                    return session.output_state(initial=True)
+                    return session.output_state(initial=True), False
 
                 # Disallow any actions (expired session)
-                if session.live is False:
-                    return session.output_expired()
+                if session is None or session.live is False:
+                    return Session.output_expired(), False
 
                 # Replay last game
                 if action == Input.Game.REPLAY:
                     session.reset()
-                    return session.output_state(initial=True)
+                    return session.output_state(initial=True), False
 
                 # Invalid command
-                self.error = True
-                return session.output_invalid()
+                return Session.output_invalid(), True
 
             # Handle invalid command
             if cmd not in {Input.Move, Input.Shoot}:
-                self.error = True
-                return session.output_invalid()
+                return Session.output_invalid(), True
 
             # Disallow any commands (expired session)
-            if session.live is False:
-                return session.output_expired()
+            if session is None or session.live is False:
+                return Session.output_expired(), False
 
             # Disallow any commands (already won)
             if session.won is True:
-                return session.output_win()
+                return session.output_win(), False
 
             # Disallow any commands (already lost)
             if session.lost is True:
-                return session.output_loss()
+                return session.output_loss(), False
 
             # Handle move command
             if cmd == Input.Move:
-                return session.move(action) + session.output_state()
+                return session.move(action) + session.output_state(), False
 
             # Handle shoot command
             if cmd == Input.Shoot:
@@ -164,67 +283,313 @@ class Game:
 
                 # Update highscore
                 if session.won is True and session.scores is True:
-                    self.log_debug(f'SCORE [client={client}, duration={session.duration:.3f}s]')
-                    if session.duration <= self.highscore.get(client, session.duration):
-                        self.highscore[client] = session.duration
-                    with open(CSV_HIGHSCORE, 'a', encoding='utf-8') as fh:
-                        fh.write(f'{int(self.utc(formatted=False))},{client},{session.duration:.3f}\n')
+                    self.log_debug(lambda: f'SCORE [client={key2ip(client)}, duration={session.duration:.3f}s]')
+                    self.highscore.add(client, session.duration)
 
                 # Return output
-                return output
+                return output, False
 
             # Handle invalid command
-            self.error = True
-            return session.output_invalid()
+            return Session.output_invalid(), True
+
+        # Parse target details
+        start = time.perf_counter() if metrics is not None else None
+        cmd, action = parse_ip(target)
+        if metrics is not None:
+            start = metrics.lap('parse', start)
+
+        # Clear expired sessions
+        n_expired = self.sessions.expire() if expire is True else 0
+
+        # Handle input commands with client session (written back to the store while holding the client's lock)
+        with self.sessions.lock(client):
+
+            # Access client session (renewing timeout) and only initialize sessions for commands depending on it
+            session = self.sessions.touch(client)
+            if session is None and cmd == Input.Game and action in SESSION_ACTIONS:
+                if self.limiter is not None and self.limiter.admit_session() is False:
+                    if metrics is not None:
+                        metrics.paths['limited'] += 1
+                    return self.output_limited(render_ip, add_delays)
+                session = Session(self.log_debug, client, self.key)
+                self.sessions.add(client, session)
+                if metrics is not None:
+                    metrics.sessions_created += 1
+            output, error = handle(session, cmd, action)
+            if session is not None:
+                self.sessions.commit(client, session)
+
+        # Count handled probe
+        if metrics is not None:
+            start = metrics.lap('session', start)
+            metrics.paths['handled'] += 1
+            metrics.command(cmd, action)
+            metrics.errors += 1 if error is True else 0
+            metrics.sessions_expired += n_expired
+
+        # Prepare output messages (including optional sleep and target)
+        output_ips = self.render(output, target, render_ip, error=error)
+        if metrics is not None:
+            metrics.lap('render', start)
+
+        # Cache output messages for remaining probes
+        self.cache.put((client, target), output_ips)
+
+        # Return output messages
+        if add_delays is False:
+            return [oip[0] for oip in output_ips]
+        return output_ips
+
+    #############
+    # SNAPSHOTS #
+    #############
 
-        # Handle input commands and prepare output messages (including optional sleep)
-        output_ips = [(output_ip(oid), None) if isinstance(oid, tuple) is False else (output_ip(oid[0]), oid[1])
-                      for oid in handle()]
+    def save_sessions(self, background=False):
+        """ Write all sessions to snapshot file (optionally from a background thread).
+
+        The sessions to write are collected when called, and packed while writing (see SessionStore.packed()).
+        """
+        # Wait for running background snapshot
+        if self.snapshot_thread is not None and background is False:
+            self.snapshot_thread.join()
+            self.snapshot_thread = None
+
+        # Collect sessions (writing them in a background thread, logging errors)
+        records = self.sessions.packed()
+        if background is True:
+            def write():
+                """ Write snapshot and log errors.
+                """
+                try:
+                    self.write_snapshot(records)
+                except OSError as error:
+                    self.log_error(f'SNAPSHOT [path={self.snapshot}, error={error}]')
+            self.snapshot_thread = threading.Thread(target=write, name='wumpus-snapshot', daemon=True)
+            self.snapshot_thread.start()
+            return
+        self.write_snapshot(records)
+
+    def write_snapshot(self, records):
+        """ Write given packed session records and atomically replace snapshot file (creating its directory if missing).
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot)), exist_ok=True)
+        tmp_path = f'{self.snapshot}.tmp'
+        with open(tmp_path, 'wb') as fh:
+            fh.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 0))
+            fh.writelines(records)
+            n_records = (fh.tell() - SNAPSHOT_HEADER.size) // SESSION_RECORD.size
+            fh.seek(0)
+            fh.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, n_records))
+        os.replace(tmp_path, self.snapshot)
+
+    def load_sessions(self, paths, shard=None):
+        """ Restore non-expired sessions from given snapshot files (optionally only clients of given shard).
+
+        Sessions are restored as packed records in least recently updated order and unpacked on first access.
+        """
+        # Read records, client keys and last updates of all snapshot files (each decoded in a single pass)
+        records, clients, last_updates, first = list(), list(), list(), operator.itemgetter(0)
+        for path in paths:
+            if os.path.isfile(path) is False:
+                continue
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            magic, n_records = SNAPSHOT_HEADER.unpack_from(data)
+            if magic != SNAPSHOT_MAGIC:
+                self.log_error(f'SNAPSHOT [path={path}, error=invalid header]')
+                continue
+            n_records = min(n_records, (len(data) - SNAPSHOT_HEADER.size) // SESSION_RECORD.size)
+            view = memoryview(data)[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + n_records * SESSION_RECORD.size]
+            records += map(first, RECORD_BYTES.iter_unpack(view))
+            clients += map(first, RECORD_CLIENT.iter_unpack(view))
+            last_updates += map(first, RECORD_LAST_UPDATE.iter_unpack(view))
+
+        # Order records by last update (if merged from several files or not in order otherwise)
+        if all(map(operator.le, last_updates, itertools.islice(last_updates, 1, None))) is False:
+            order = sorted(range(len(records)), key=last_updates.__getitem__)
+            records, clients = [records[n] for n in order], [clients[n] for n in order]
+            last_updates = [last_updates[n] for n in order]
+
+        # Skip expired sessions at the front (and clients of other shards)
+        start = bisect.bisect_right(last_updates, time.time() - GAME_TIMEOUT)
+        records, clients = records[start:], clients[start:]
+        if shard is not None:
+            selected = [shard_index(key2packed(client), shard[1]) == shard[0] for client in clients]
+            records, clients = list(itertools.compress(records, selected)), list(itertools.compress(clients, selected))
+
+        # Restore records of non-expired sessions
+        self.sessions.add_packed_all(clients, records)
+        n_restored = len(records)
+
+        # Return number of restored sessions
+        self.log_debug(f'SNAPSHOT [paths={",".join(paths)}, restored={n_restored}]')
+        return n_restored
+
+    def checkpoint(self, interval=SNAPSHOT_INTERVAL):
+        """ Periodically write snapshot of all sessions in the background (if enabled).
+        """
+        # Skip if disabled or a background snapshot is still running
+        if self.snapshot is None:
+            return
+        if self.snapshot_thread is not None:
+            if self.snapshot_thread.is_alive() is True:
+                return
+            self.snapshot_thread = None
+
+        # Write snapshot if due
+        now = time.time()
+        if now - self.last_snapshot >= interval:
+            self.last_snapshot = now
+            self.save_sessions(background=True)
+
+    ###########
+    # SCREENS #
+    ###########
+
+    @staticmethod
+    def render(output, target, render_ip, error=False):
+        """ Render output IDs (with optional sleep) to (address, sleep) tuples and add target (or an empty line).
+        """
+        # Prepare output messages
+        output_ips = [(render_ip(oid), None) if isinstance(oid, tuple) is False else (render_ip(oid[0]), oid[1])
+                      for oid in output]
 
         # Add target to output message
-        if self.error is False:
+        if error is False:
             if target not in set(output_ips):
                 output_ips.append((target, None))
         else:
-            output_ips.append((output_ip(Output.GAME_EMPTY), None))
-
-        # Return output messages
-        if add_delays is False:
-            return [oip[0] for oip in output_ips]
+            output_ips.append((render_ip(Output.GAME_EMPTY), None))
         return output_ips
 
+    def output_score(self, revision=None):
+        """ Return output of the highscore screen (cached until the top entries change).
+        """
+        # Reuse output of current top entries
+        revision = self.highscore.revision() if revision is None else revision
+        if self.score[0] == revision:
+            return list(self.score[1])
+        output = Session.output_score()
+
+        # Add top players
+        last_duration = 0
+        top = self.highscore.top()
+        for player, duration in top:
+            output.append((player, duration - last_duration))
+            last_duration = duration
+        if len(top) < MAX_HIGHSCORE:
+            output += [(None, None)] * (MAX_HIGHSCORE - len(top))
+
+        # Add footer and cache output
+        output.append(Output.GAME_EMPTY)
+        output.append(Output.GAME_PLAY)
+        self.score = (revision, output)
+        return list(output)
+
+    def score_screen(self, target, render_ip):
+        """ Return rendered highscore screen for given target (cached until the top entries change).
+        """
+        # Render screen again only after the top entries changed
+        revision = self.highscore.revision()
+        screen = self.score_screens.get(target, None)
+        if screen is None or screen[2] != revision:
+            output_ips = self.render(self.output_score(revision), target, render_ip)
+            screen = ([oip[0] for oip in output_ips], output_ips, revision)
+            self.score_screens[target] = screen
+        return screen
+
+    ###########
+    # METRICS #
+    ###########
+
+    def export_metrics(self):
+        """ Return metrics in Prometheus text format (including session table gauges).
+        """
+        return self.metrics.render([
+            ('wumpus_sessions', 'gauge', 'Sessions in the session table.', len(self.sessions)),
+            ('wumpus_sessions_evicted_total', 'counter', 'Sessions evicted from the full session table.',
+             self.sessions.evicted),
+        ])
+
     ###########
     # HELPERS #
     ###########
 
+    @staticmethod
+    def output_limited(render_ip, add_delays):
+        """ Return static output for probes over budget (not cached and without touching any session).
+        """
+        output_ip = render_ip(Output.GAME_EMPTY)
+        if add_delays is False:
+            return [output_ip]
+        return [(output_ip, None)]
+
     def log_debug(self, message):
-        """ Log debug message.
+        """ Log debug message (given as string or as callable returning the string, formatted lazily).
         """
+        # Skip formatting if message is not logged anywhere
+        console = self.verbose is True and self.debug is True
+        if self.logfile is None and console is False:
+            return
+        if callable(message) is True:
+            message = message()
+
         # Print colored console output
         msg = f'{self.utc()} {message}'
         if self.logfile is not None:
-            with open(self.logfile, 'a', encoding='utf-8') as fh:
-                fh.write(msg + '\n')
-        if self.verbose is True and self.debug is True:
+            self.write(self.logfile, msg)
+        if console is True:
             print(f'\033[1;90m{msg}\033[0m\033[27m')
 
+    def log_command(self, client, target, proto, packed, cmd, action):
+        """ Log debug message of given input command.
+        """
+        cmd_str = cmd.__name__.lower() if cmd is not None else '?'
+        action_str = str(action) if action is not None else '?'
+        proto_str = str(proto) if proto is not None else '?'
+        target_str = packed2ip(target) if packed is True else target
+        self.log_debug(lambda: f'CMD [client={key2ip(client)}, target={target_str}, proto={proto_str}, '
+                               f'cmd={cmd_str}, action={action_str}]')
+
     def log_error(self, message):
         """ Log error message.
         """
         msg = f'{self.utc()} ERROR {message}'
         if self.logfile is not None:
-            with open(self.logfile, 'a', encoding='utf-8') as fh:
-                fh.write(msg + '\n')
+            self.write(self.logfile, msg)
         if self.verbose is True:
             print(f'\033[1;31m{msg}\033[0m\033[27m')
 
+    def write(self, path, line):
+        """ Append line to given file via buffered logger (or pass it to the writer if set).
+        """
+        if self.writer is not None:
+            self.writer(path, line)
+            return
+        self.logger.write(path, line)
+
     @staticmethod
     def utc(formatted=True):
         """ Return current timestamp relative to UTC epoch.
         """
-        ts = (datetime.datetime.utcnow() - datetime.datetime(1970, 1, 1)).total_seconds()
+        ts = time.time()
         if formatted is True:
-            dt = datetime.datetime.utcfromtimestamp(ts)
-            millis = f'{dt.microsecond / 1000.0:03.0f}'
-            return f'{dt.strftime("%Y-%m-%d %H:%M:%S")}.{millis[0:3]}'
+            return timestamp(ts)
         return ts
+
+
+#################
+# SCREEN TABLES #
+#################
+
+# Rendered static screens (address list and (address, sleep) tuples) by target address string and packed address
+STATIC_SCREENS = dict()
+for screen_target, screen_output in ((game_ip(Input.Game.START), Session.output_title()),
+                                     (game_ip(Input.Game.MAP), Session.output_map()),
+                                     (TRACE_TARGET_IPV4, Session.output_ipv4())):
+    for screen_key, screen_render in ((screen_target, output_ip), (ip2packed(screen_target), output_packed)):
+        screen_ips = Game.render(screen_output, screen_key, screen_render)
+        STATIC_SCREENS[screen_key] = ([oip[0] for oip in screen_ips], screen_ips)
+
+# Highscore screen targets
+SCORE_TARGETS = {game_ip(Input.Game.SCORE), ip2packed(game_ip(Input.Game.SCORE))}
@@ -11,12 +11,15 @@ Author Leonhard RABEL <rabel@leitwert.net>
 """
 
 # System imports
+import functools
 import math
 import socket
 import struct
 
 # Local imports
 from wumpus.const import Input
+from wumpus.const import Output
+from wumpus.const import ROOMS
 from wumpus.const import TRACE_PREFIX_GAME
 from wumpus.const import TRACE_PREFIX_MOVE
 from wumpus.const import TRACE_PREFIX_SHOOT
@@ -30,6 +33,13 @@ FIXED_HOST_VALUE_CHARS = 2
 FIXED_HOST_VALUE_OFFSET = 2**((FIXED_HOST_VALUE_CHARS - 1) * 4)
 FIXED_HOST_VALUES = 2**(FIXED_HOST_VALUE_CHARS * 4) - FIXED_HOST_VALUE_OFFSET
 
+# Shoot actions (rooms as digits of given base, up to given number of shots)
+SHOOT_BASE = 21
+SHOOT_MAX_SHOTS = 5
+
+# IPv4-mapped IPv6 prefix (::ffff:0:0/96)
+IPV4_MAPPED_PREFIX = bytes(10) + b'\xff\xff'
+
 
 ################
 # INPUT/OUTPUT #
@@ -40,7 +50,10 @@ def game_ip(action, fwd=True):
     """
     if fwd is not True:
         return int2rdns(int_to_host(action))
-    return int2ip(cidr2int(TRACE_PREFIX_GAME)[0] + int_to_host(action))
+    ip = GAME_IPS.get(action, None)
+    if ip is not None:
+        return ip
+    return int2ip(PREFIX_GAME + int_to_host(action))
 
 
 def move_ip(room, fwd=True):
@@ -48,7 +61,10 @@ def move_ip(room, fwd=True):
     """
     if fwd is not True:
         return int2rdns(int_to_host(room))
-    return int2ip(cidr2int(TRACE_PREFIX_MOVE)[0] + int_to_host(room))
+    ip = MOVE_IPS.get(room, None)
+    if ip is not None:
+        return ip
+    return int2ip(PREFIX_MOVE + int_to_host(room))
 
 
 def shoot_ip(shots, fwd=True):
@@ -56,71 +72,104 @@ def shoot_ip(shots, fwd=True):
     """
     shots_int = 0
     for n_shot, shot in enumerate(shots):
-        shots_int += shot * 21 ** n_shot
+        shots_int += shot * SHOOT_BASE ** n_shot
     if fwd is not True:
         return int2rdns(int_to_host(shots_int))
-    return int2ip(cidr2int(TRACE_PREFIX_SHOOT)[0] + int_to_host(shots_int))
+    return int2ip(PREFIX_SHOOT + int_to_host(shots_int))
 
 
 def output_ip(oid, fwd=True):
-    """ Convert output text ID to IPv6 address (or reverse zone).
+    """ Convert output text ID (or IPv4/IPv6 address string or key) to IPv6 address (or reverse zone).
     """
+    ip = (OUTPUT_IPS if fwd is True else OUTPUT_RDNS).get(oid, None)
+    if ip is not None:
+        return ip
     if oid is None or isinstance(oid, str) is True:
         return oid
+    if isinstance(oid, bytes) is True:
+        return key2ip(oid)
     if fwd is not True:
-        return int2rdns(int_to_host(240**3 - 240 + oid))
-    return int2ip(cidr2int(TRACE_PREFIX_OUTPUT)[0] + int_to_host(240**3 - 240 + oid))
+        return int2rdns(output_int(oid))
+    return int2ip(PREFIX_OUTPUT + output_int(oid))
+
+
+def output_int(oid):
+    """ Convert output text ID to IPv6 host integer.
+    """
+    return int_to_host(240**3 - 240 + oid)
+
+
+def output_packed(oid):
+    """ Convert output text ID (or IPv4/IPv6 address string or key) to packed address.
+    """
+    packed = OUTPUT_PACKED.get(oid, None)
+    if packed is not None:
+        return packed
+    if oid is None:
+        return None
+    if isinstance(oid, str) is True:
+        return ip2packed(oid)
+    if isinstance(oid, bytes) is True:
+        return key2packed(oid)
+    return (PREFIX_OUTPUT + output_int(oid)).to_bytes(16, 'big')
 
 
 def input_ip(ip):
-    """ Split IPv6 integer into net (command) and host (action) parts.
+    """ Split IPv6 address into command and action parts.
     """
+    # Lookup precomputed commands
+    parsed = INPUT_IPS.get(ip, None)
+    if parsed is not None:
+        return parsed
+
     # Parse input IP address
-    cmd, action = None, None
     try:
-        # Support IPv4 in fallback mode
-        if ip == TRACE_TARGET_IPV4:
-            return Input.Game, Input.Game.IPV4
-
         # Ignore any other IPv4 address
         if ipv4(ip) is True:
             return None, None
 
         # Convert IPv6 address to integer
-        ipint = ip2int(ip)
-
-        # Split into network and fixed-size host integers
-        cmd = (ipint >> (FIXED_HOST_BYTES * 8)) << (FIXED_HOST_BYTES * 8)
-        cmd = {cidr2int(p)[0]: p for p in (TRACE_PREFIX_GAME, TRACE_PREFIX_MOVE, TRACE_PREFIX_SHOOT)}.get(cmd, None)
-        if cmd is not None:
-            action = host_to_int(ipint & (2**(FIXED_HOST_BYTES * 8) - 1))
-
-        def int_to_shots(shots_int):
-            """ Compute shot factors from fixed-base shot integer.
-            """
-            # Iterate shots
-            shots = list()
-            while True:
-                shots_int, shot = divmod(shots_int, 21)
-                shots.append(shot)
-                if shots_int == 0:
-                    break
-
-            # Return tupelized shots
-            return tuple(shots) if len(shots) > 0 else None
-
-        # Parse command and action
-        cmd, parse_action = {
-            TRACE_PREFIX_GAME: (Input.Game, None),
-            TRACE_PREFIX_MOVE: (Input.Move, None),
-            TRACE_PREFIX_SHOOT: (Input.Shoot, int_to_shots),
-        }.get(cmd, (None, None))
-        if parse_action is not None:
-            action = parse_action(action)
+        return input_int(ip2int(ip))
 
     # Ignore command/action errors
     except:  # pylint: disable=bare-except
-        pass
+        return None, None
+
+
+def input_packed(packed):
+    """ Split packed IPv6 address into command and action parts.
+    """
+    # Support IPv4 in fallback mode
+    if len(packed) == 4:
+        if packed == TARGET_IPV4_PACKED:
+            return Input.Game, Input.Game.IPV4
+        return None, None
+
+    # Ignore anything but IPv6 addresses
+    if len(packed) != 16:
+        return None, None
+    return input_int(int.from_bytes(packed, 'big'))
+
+
+def input_int(ipint):
+    """ Split IPv6 integer into net (command) and host (action) parts.
+    """
+    # Lookup precomputed commands
+    parsed = INPUT_INTS.get(ipint, None)
+    if parsed is not None:
+        return parsed
+
+    # Split into network and fixed-size host integers
+    cmd = PREFIX_COMMANDS.get((ipint >> (FIXED_HOST_BYTES * 8)) << (FIXED_HOST_BYTES * 8), None)
+    if cmd is None:
+        return None, None
+    action = host_to_int(ipint & (2**(FIXED_HOST_BYTES * 8) - 1))
+
+    # Parse shoot action (ignoring hosts out of range of valid shots, e.g. with groups below the value offset)
+    if cmd == Input.Shoot:
+        if action < 0 or action >= SHOOT_BASE ** SHOOT_MAX_SHOTS:
+            return None, None
+        action = int_to_shots(action)
 
     # Return parsed result
     return cmd, action
@@ -148,6 +197,22 @@ def int_to_host(value):
     return host
 
 
+@functools.lru_cache(maxsize=2**16)
+def int_to_shots(shots_int):
+    """ Compute shot factors from fixed-base shot integer.
+    """
+    # Iterate shots
+    shots = list()
+    while True:
+        shots_int, shot = divmod(shots_int, SHOOT_BASE)
+        shots.append(shot)
+        if shots_int == 0:
+            break
+
+    # Return tupelized shots
+    return tuple(shots) if len(shots) > 0 else None
+
+
 def host_to_int(host):
     """ Convert fixed-length IPv6 host to integer value.
     """
@@ -176,6 +241,51 @@ def ipv4(ip):
     return True
 
 
+def ip2packed(ip):
+    """ Convert an IPv4 or IPv6 address from dotted notation to packed bytes.
+    """
+    try:
+        return socket.inet_pton(socket.AF_INET6 if ':' in ip else socket.AF_INET, ip)
+    except (socket.error, TypeError) as error:
+        raise ValueError("invalid ip address") from error
+
+
+def packed2ip(packed):
+    """ Convert a packed IPv4 or IPv6 address to dotted notation.
+    """
+    try:
+        return socket.inet_ntop(socket.AF_INET6 if len(packed) == 16 else socket.AF_INET, bytes(packed))
+    except (socket.error, ValueError) as error:
+        raise ValueError("invalid ip address") from error
+
+
+def ip2key(ip):
+    """ Convert an IPv4 or IPv6 address (dotted notation or packed bytes) to a 16 byte key (IPv4 mapped to IPv6).
+    """
+    packed = ip2packed(ip) if isinstance(ip, str) is True else bytes(ip)
+    if len(packed) == 16:
+        return packed
+    if len(packed) == 4:
+        return IPV4_MAPPED_PREFIX + packed
+    raise ValueError("invalid ip address")
+
+
+def key2ip(key):
+    """ Convert a 16 byte key to dotted notation (IPv4-mapped keys to IPv4).
+    """
+    if key[:12] == IPV4_MAPPED_PREFIX:
+        return packed2ip(key[12:])
+    return packed2ip(key)
+
+
+def key2packed(key):
+    """ Convert a 16 byte key to packed address (IPv4-mapped keys to 4 bytes).
+    """
+    if key[:12] == IPV4_MAPPED_PREFIX:
+        return key[12:]
+    return key
+
+
 def int2ip(addr):
     """ Convert an IPv6 address from 128 bit unsigned integer to dotted notation.
     """
@@ -200,7 +310,7 @@ def int2rdns(addr):
     """ Convert an IPv6 address from integer to reversed dotted notation for arpa zones.
     """
     ip = list()
-    for _ in range(0, 128 - cidr2int(TRACE_PREFIX_OUTPUT)[1], 4):
+    for _ in range(0, 128 - PREFIX_OUTPUT_MASK, 4):
         ip.append(hex(addr & 0xf)[2:])
         addr >>= 4
     return '.'.join(ip)
@@ -213,3 +323,58 @@ def cidr2int(prefix):
     ip, mask = prefix.split('/', 1)
     net, host = struct.unpack('!QQ', socket.inet_pton(socket.AF_INET6, ip))
     return (net << 64) + host, int(mask)
+
+
+def cidr2rdns(prefix):
+    """ Convert CIDR IPv6 prefix string (with nibble aligned length) to reversed dotted notation of its arpa zone.
+    """
+    net, mask = cidr2int(prefix)
+    if mask % 4 != 0:
+        raise ValueError("prefix length not nibble aligned")
+    return '.'.join(f'{(net >> (124 - 4 * n_nibble)) & 0xf:x}' for n_nibble in reversed(range(mask // 4))) + '.ip6.arpa'
+
+
+#################
+# LOOKUP TABLES #
+#################
+
+# Prefix integers
+PREFIX_GAME = cidr2int(TRACE_PREFIX_GAME)[0]
+PREFIX_MOVE = cidr2int(TRACE_PREFIX_MOVE)[0]
+PREFIX_SHOOT = cidr2int(TRACE_PREFIX_SHOOT)[0]
+PREFIX_OUTPUT, PREFIX_OUTPUT_MASK = cidr2int(TRACE_PREFIX_OUTPUT)
+PREFIX_COMMANDS = {
+    PREFIX_GAME: Input.Game,
+    PREFIX_MOVE: Input.Move,
+    PREFIX_SHOOT: Input.Shoot,
+}
+
+# Output text IDs
+OUTPUT_IDS = sorted({oid for value in vars(Output).values()
+                     for oid in (value if isinstance(value, list) is True else [value])
+                     if isinstance(oid, int) is True})
+
+# Output addresses (by output ID and reverse)
+OUTPUT_INTS = {oid: PREFIX_OUTPUT + output_int(oid) for oid in OUTPUT_IDS}
+OUTPUT_IPS = {oid: int2ip(ipint) for oid, ipint in OUTPUT_INTS.items()}
+OUTPUT_PACKED = {oid: ipint.to_bytes(16, 'big') for oid, ipint in OUTPUT_INTS.items()}
+OUTPUT_PACKED.update({ip: socket.inet_pton(socket.AF_INET, ip) for ip in Output.INFO_IPV4})
+OUTPUT_RDNS = {oid: int2rdns(output_int(oid)) for oid in OUTPUT_IDS}
+OUTPUT_IDS_BY_IP = {ip: oid for oid, ip in OUTPUT_IPS.items()}
+OUTPUT_IDS_BY_PACKED = {packed: oid for oid, packed in OUTPUT_PACKED.items() if len(packed) == 16}
+
+# Game/move addresses
+GAME_ACTIONS = [value for name, value in vars(Input.Game).items() if name.isupper() is True and value >= 0]
+GAME_IPS = {action: int2ip(PREFIX_GAME + int_to_host(action)) for action in GAME_ACTIONS}
+MOVE_IPS = {room: int2ip(PREFIX_MOVE + int_to_host(room)) for room in ROOMS}
+
+# Input commands (by integer and by address)
+INPUT_INTS = dict()
+INPUT_INTS.update({ip2int(ip): (Input.Game, action) for action, ip in GAME_IPS.items()})
+INPUT_INTS.update({ip2int(ip): (Input.Move, room) for room, ip in MOVE_IPS.items()})
+INPUT_INTS.update({PREFIX_SHOOT + int_to_host(room): (Input.Shoot, (room, )) for room in ROOMS})
+INPUT_IPS = {int2ip(ipint): parsed for ipint, parsed in INPUT_INTS.items()}
+INPUT_IPS[TRACE_TARGET_IPV4] = (Input.Game, Input.Game.IPV4)
+
+# IPv4 target address
+TARGET_IPV4_PACKED = socket.inet_pton(socket.AF_INET, TRACE_TARGET_IPV4)
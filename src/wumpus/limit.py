@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import collections
+import threading
+import time
+
+# Local imports
+from wumpus.iputil import IPV4_MAPPED_PREFIX
+
+# Probe budget per client (probes per second, burst)
+LIMIT_CLIENT_RATE = 20
+LIMIT_CLIENT_BURST = 100
+
+# Probe budget per network (IPv6 /64 or IPv4 /24)
+LIMIT_NETWORK_RATE = 100
+LIMIT_NETWORK_BURST = 500
+
+# Budget of new sources (untracked clients or networks per second, burst)
+LIMIT_SOURCE_RATE = 1000
+LIMIT_SOURCE_BURST = 1000
+
+# Budget of new sessions (sessions per second, burst)
+LIMIT_SESSION_RATE = 1000
+LIMIT_SESSION_BURST = 1000
+
+# Tracked clients and networks (least recently seen are dropped beyond)
+LIMIT_ENTRIES = 2**16
+
+
+class RateLimiter:
+    """ Admission control by token buckets per client, per network and for new sessions.
+
+    Buckets are refilled lazily on access and kept in bounded LRU tables, so admitting a probe takes constant time and
+    memory stays bounded however many sources send probes. Buckets of untracked sources (new or dropped) are only
+    added if a shared budget of new sources admits them, so floods from random source addresses neither get a fresh
+    burst per probe nor push tracked sources out of the tables. Buckets are charged under a lock, so a limiter may be
+    shared by game threads.
+    """
+    def __init__(self, client_rate=LIMIT_CLIENT_RATE, client_burst=LIMIT_CLIENT_BURST, network_rate=LIMIT_NETWORK_RATE,
+                 network_burst=LIMIT_NETWORK_BURST, source_rate=LIMIT_SOURCE_RATE, source_burst=LIMIT_SOURCE_BURST,
+                 session_rate=LIMIT_SESSION_RATE, session_burst=LIMIT_SESSION_BURST, entries=LIMIT_ENTRIES):
+        """ Initialize rate limiter.
+        """
+        # Prepare internals
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.network_rate = network_rate
+        self.network_burst = network_burst
+        self.source_rate = source_rate
+        self.source_burst = source_burst
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.entries = entries
+        self.clients = collections.OrderedDict()
+        self.networks = collections.OrderedDict()
+        self.sources = [source_burst, time.monotonic()]
+        self.sessions = [session_burst, time.monotonic()]
+        self.limited_probes = 0
+        self.limited_sessions = 0
+        self.lock = threading.Lock()
+
+    def admit(self, client, now=None):
+        """ Check (and charge) probe budget of given client key and its network.
+        """
+        with self.lock:
+            # Refill network (IPv6 /64 or IPv4 /24) and client buckets
+            now = time.monotonic() if now is None else now
+            network = client[:15] if client[:12] == IPV4_MAPPED_PREFIX else client[:8]
+            network_bucket = self.bucket(self.networks, network, self.network_rate, self.network_burst, now)
+            client_bucket = self.bucket(self.clients, client, self.client_rate, self.client_burst, now)
+
+            # Charge budget of new sources before tracking untracked client or network
+            if network_bucket is None or client_bucket is None:
+                if self.refill(self.sources, self.source_rate, self.source_burst, now) < 1:
+                    self.limited_probes += 1
+                    return False
+                self.sources[0] -= 1
+                if network_bucket is None:
+                    network_bucket = self.add(self.networks, network, self.network_burst, now)
+                if client_bucket is None:
+                    client_bucket = self.add(self.clients, client, self.client_burst, now)
+
+            # Charge both budgets only if both admit the probe (so limited clients do not drain their network's budget)
+            if network_bucket[0] < 1 or client_bucket[0] < 1:
+                self.limited_probes += 1
+                return False
+            network_bucket[0] -= 1
+            client_bucket[0] -= 1
+            return True
+
+    def admit_session(self, now=None):
+        """ Check (and charge) budget of new sessions.
+        """
+        with self.lock:
+            # Refill and charge bucket
+            now = time.monotonic() if now is None else now
+            if self.refill(self.sessions, self.session_rate, self.session_burst, now) < 1:
+                self.limited_sessions += 1
+                return False
+            self.sessions[0] -= 1
+            return True
+
+    def bucket(self, buckets, key, rate, burst, now):
+        """ Return refilled [tokens, last refill] bucket of given key (or None if untracked).
+        """
+        # Access bucket as most recently used
+        bucket = buckets.get(key, None)
+        if bucket is not None:
+            buckets.move_to_end(key)
+            self.refill(bucket, rate, burst, now)
+        return bucket
+
+    def add(self, buckets, key, burst, now):
+        """ Add full bucket of given key (dropping the least recently used bucket beyond the number of entries).
+        """
+        bucket = [burst, now]
+        buckets[key] = bucket
+        if len(buckets) > self.entries:
+            buckets.popitem(last=False)
+        return bucket
+
+    @staticmethod
+    def refill(bucket, rate, burst, now):
+        """ Refill given [tokens, last refill] bucket at given rate up to burst (returning available tokens).
+        """
+        bucket[0] = min(burst, bucket[0] + max(0, now - bucket[1]) * rate)
+        bucket[1] = now
+        return bucket[0]
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import atexit
+import collections
+import os
+import threading
+import time
+
+# Flush thresholds
+LOG_FLUSH_LINES = 1024
+LOG_FLUSH_INTERVAL = 1.0
+
+# Buffer capacity (oldest lines are dropped beyond)
+LOG_BUFFER_LINES = 2**18
+
+# Cached timestamp prefix (second, formatted second; replaced as a whole, as shared between threads)
+TIMESTAMP_CACHE = (None, None)
+
+
+class Logger:
+    """ Buffered writer appending lines to files.
+
+    Lines are collected in a bounded ring buffer and written by a background thread, either every <flush_interval>
+    seconds or as soon as <flush_lines> lines are pending. Files are opened once and kept open (and optionally synced
+    to disk after each flush). Lines that fail to be written (e.g. on a full disk) are counted as dropped, and their
+    file is opened again on the next flush. Other disk work may be queued to run on the background thread after the
+    next flush as well (see call()), with failing calls counted.
+    """
+    def __init__(self, flush_lines=LOG_FLUSH_LINES, flush_interval=LOG_FLUSH_INTERVAL, buffer_lines=LOG_BUFFER_LINES,
+                 fsync=False):
+        """ Initialize logger.
+        """
+        # Prepare internals
+        self.fsync = fsync
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self.buffer = collections.deque(maxlen=buffer_lines)
+        self.files = dict()
+        self.tasks = collections.deque()
+        self.dropped = 0
+        self.failed_tasks = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.closed = False
+
+    def write(self, path, line):
+        """ Queue line to be appended to given file.
+        """
+        # Start background thread on first use (once, if written by several threads)
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.start()
+
+        # Append line (dropping the oldest line if the buffer is full)
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append((path, line))
+        if len(self.buffer) >= self.flush_lines:
+            self.wakeup.set()
+
+    def call(self, task):
+        """ Queue callable to be run by the background thread after the next flush.
+        """
+        # Start background thread on first use (see write())
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.start()
+
+        # Queue task and wake up background thread
+        self.tasks.append(task)
+        self.wakeup.set()
+
+    def start(self):
+        """ Start background flush thread.
+        """
+        self.thread = threading.Thread(target=self.run, name='wumpus-logger', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def run(self):
+        """ Flush pending lines periodically (or when woken up) until closed.
+        """
+        while self.closed is False:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+            self.run_tasks()
+
+    def run_tasks(self):
+        """ Run queued tasks (counting tasks failing on disk errors).
+        """
+        while len(self.tasks) > 0:
+            try:
+                self.tasks.popleft()()
+            except OSError:
+                self.failed_tasks += 1
+
+    def flush(self):
+        """ Write pending lines to their files.
+        """
+        with self.lock:
+            # Collect pending lines by file
+            lines = collections.OrderedDict()
+            while len(self.buffer) > 0:
+                path, line = self.buffer.popleft()
+                lines.setdefault(path, list()).append(line + '\n')
+
+            # Append lines to (persistent) file handles (creating missing directories)
+            for path, file_lines in lines.items():
+                try:
+                    fh = self.files.get(path, None)
+                    if fh is None:
+                        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                        fh = open(path, 'a', encoding='utf-8')  # pylint: disable=consider-using-with
+                        self.files[path] = fh
+                    fh.writelines(file_lines)
+                    fh.flush()
+                    if self.fsync is True:
+                        os.fsync(fh.fileno())
+
+                # Count lines of failed files as dropped (reopening files on next flush)
+                except OSError:
+                    self.dropped += len(file_lines)
+                    self.discard(path)
+
+    def discard(self, path):
+        """ Close file handle of given file (if open, ignoring errors).
+        """
+        fh = self.files.pop(path, None)
+        if fh is not None:
+            try:
+                fh.close()
+            except OSError:
+                pass
+
+    def close(self):
+        """ Flush pending lines and close files.
+        """
+        # Stop background thread
+        self.closed = True
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+        # Flush and close files (running remaining tasks)
+        self.flush()
+        self.run_tasks()
+        with self.lock:
+            for path in list(self.files):
+                self.discard(path)
+
+
+def timestamp(ts=None):
+    """ Format timestamp (current time by default) as UTC with milliseconds.
+    """
+    # Reuse formatted second
+    global TIMESTAMP_CACHE  # pylint: disable=global-statement
+    ts = time.time() if ts is None else ts
+    second = int(ts)
+    cached_second, formatted = TIMESTAMP_CACHE
+    if cached_second != second:
+        formatted = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(second))
+        TIMESTAMP_CACHE = (second, formatted)
+
+    # Append milliseconds
+    return f'{formatted}.{int((ts - second) * 1000):03d}'
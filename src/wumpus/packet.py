@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import collections
+import struct
+import threading
+
+# Ethernet types
+ETH_P_IP = 0x0800
+ETH_P_IPV6 = 0x86dd
+
+# IP protocols
+IPPROTO_ICMP = 1
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPPROTO_ICMPV6 = 58
+
+# ICMP types
+ICMP_ECHO_REPLY = 0
+ICMP_UNREACH = 3
+ICMP_UNREACH_PORT = 3
+ICMP_ECHO_REQUEST = 8
+ICMP_TIME_EXCEEDED = 11
+
+# ICMPv6 types
+ICMPV6_UNREACH = 1
+ICMPV6_UNREACH_PORT = 4
+ICMPV6_TIME_EXCEEDED = 3
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+# TCP flags
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+# Reply limits (quoted invoking packet must fit into minimum MTU)
+QUOTE_MAX_IPV6 = 1280 - 40 - 8
+QUOTE_MAX_IPV4 = 576 - 20 - 8
+
+# Reply hop limit
+REPLY_HLIM = 64
+
+# Protocol names
+PROTO_NAMES = {
+    IPPROTO_ICMP: 'icmp',
+    IPPROTO_ICMPV6: 'icmp',
+    IPPROTO_TCP: 'tcp',
+    IPPROTO_UDP: 'udp',
+}
+
+# Parsed probe packet
+Probe = collections.namedtuple('Probe', ['frame', 'version', 'src', 'dst', 'proto', 'hlim', 'l3', 'l4', 'echo'])
+
+
+#########
+# PARSE #
+#########
+
+def parse(frame):
+    """ Parse Ethernet frame into probe details (or None if not a supported probe).
+    """
+    # Parse Ethernet header
+    if len(frame) < 14:
+        return None
+    ethertype = (frame[12] << 8) | frame[13]
+
+    # Parse IPv6 header
+    if ethertype == ETH_P_IPV6:
+        if len(frame) < 14 + 40 + 8:
+            return None
+        version, proto, hlim, src, dst, l4 = 6, frame[20], frame[21], bytes(frame[22:38]), bytes(frame[38:54]), 54
+        icmp_proto, echo_type = IPPROTO_ICMPV6, ICMPV6_ECHO_REQUEST
+
+    # Parse IPv4 header
+    elif ethertype == ETH_P_IP:
+        l4 = 14 + (frame[14] & 0x0f) * 4
+        if len(frame) < l4 + 8 or l4 < 34:
+            return None
+        version, proto, hlim, src, dst = 4, frame[23], frame[22], bytes(frame[26:30]), bytes(frame[30:34])
+        icmp_proto, echo_type = IPPROTO_ICMP, ICMP_ECHO_REQUEST
+
+    # Ignore other protocols
+    else:
+        return None
+
+    # Accept UDP/TCP probes and ICMP echo requests only
+    echo = False
+    if proto == icmp_proto:
+        if frame[l4] != echo_type:
+            return None
+        echo = True
+    elif proto not in {IPPROTO_UDP, IPPROTO_TCP}:
+        return None
+
+    # Return probe details
+    return Probe(frame, version, src, dst, PROTO_NAMES[proto], hlim, 14, l4, echo)
+
+
+#########
+# CRAFT #
+#########
+
+def time_exceeded(probe, src):
+    """ Craft ICMP time exceeded reply for given probe from given source address.
+    """
+    return TEMPLATES_TIME_EXCEEDED[probe.version].build(probe, src)
+
+
+def destination_reached(probe, src):
+    """ Craft final reply (echo reply, port unreachable or TCP reset) for given probe from given source address.
+    """
+    # Reply to ping
+    if probe.echo is True:
+        return echo_reply(probe, src)
+
+    # Reset TCP connection
+    if probe.proto == 'tcp':
+        return tcp_reset(probe, src)
+
+    # Reject UDP datagram
+    return TEMPLATES_PORT_UNREACHABLE[probe.version].build(probe, src)
+
+
+def echo_reply(probe, src):
+    """ Craft ICMP/ICMPv6 echo reply for given echo request.
+    """
+    # Copy request (swapping Ethernet addresses)
+    frame, l4 = probe.frame, probe.l4
+    reply = bytearray(frame[:packet_end(probe)])
+    reply[0:6], reply[6:12] = frame[6:12], frame[0:6]
+    csum = (reply[l4 + 2] << 8) | reply[l4 + 3]
+
+    # Rewrite IPv6 header (the pseudo header only changes by the reply source)
+    if probe.version == 6:
+        reply[21] = REPLY_HLIM
+        reply[22:38], reply[38:54] = src, probe.src
+        reply[l4] = ICMPV6_ECHO_REPLY
+        csum = checksum_update(csum, (ICMPV6_ECHO_REQUEST << 8) + checksum_add(probe.dst),
+                               (ICMPV6_ECHO_REPLY << 8) + checksum_add(src))
+
+    # Rewrite IPv4 header (and patch header checksum)
+    else:
+        ip_csum = (reply[24] << 8) | reply[25]
+        ip_csum = checksum_update(ip_csum, (reply[22] << 8) + checksum_add(probe.dst),
+                                  (REPLY_HLIM << 8) + checksum_add(src))
+        reply[22] = REPLY_HLIM
+        reply[24], reply[25] = ip_csum >> 8, ip_csum & 0xff
+        reply[26:30], reply[30:34] = src, probe.src
+        reply[l4] = ICMP_ECHO_REPLY
+        csum = checksum_update(csum, ICMP_ECHO_REQUEST << 8, ICMP_ECHO_REPLY << 8)
+
+    # Patch ICMP checksum
+    reply[l4 + 2], reply[l4 + 3] = csum >> 8, csum & 0xff
+    return bytes(reply)
+
+
+def tcp_reset(probe, src):
+    """ Craft TCP reset for given TCP probe.
+    """
+    # Swap ports and acknowledge probe
+    sport, dport, seq, ack, _, flags = struct.unpack_from('!HHIIBB', probe.frame, probe.l4)
+    rst_seq = ack if flags & TCP_ACK else 0
+    rst_ack = (seq + 1 if flags & TCP_SYN else seq) & 0xffffffff
+    segment = struct.pack('!HHIIBBHHH', dport, sport, rst_seq, rst_ack, 5 << 4, TCP_RST | TCP_ACK, 0, 0, 0)
+    if probe.version == 6:
+        return ipv6(probe, src, IPPROTO_TCP, segment, 16)
+    return ipv4(probe, src, IPPROTO_TCP, segment, 16)
+
+
+def ipv6(probe, src, proto, payload, csum_offset):
+    """ Craft Ethernet/IPv6 frame with given payload (and checksum at given offset) towards probe source.
+    """
+    # Compute upper-layer checksum (including pseudo header)
+    payload = bytearray(payload)
+    csum = checksum_add(src) + checksum_add(probe.src) + len(payload) + proto
+    struct.pack_into('!H', payload, csum_offset, checksum(payload, csum))
+
+    # Prepare headers
+    header = struct.pack('!IHBB', 6 << 28, len(payload), proto, REPLY_HLIM) + src + probe.src
+    return ethernet(probe, ETH_P_IPV6) + header + payload
+
+
+def ipv4(probe, src, proto, payload, csum_offset):
+    """ Craft Ethernet/IPv4 frame with given payload (and checksum at given offset) towards probe source.
+    """
+    # Compute upper-layer checksum (pseudo header for TCP only)
+    payload = bytearray(payload)
+    csum = 0
+    if proto != IPPROTO_ICMP:
+        csum = checksum_add(src) + checksum_add(probe.src) + len(payload) + proto
+    struct.pack_into('!H', payload, csum_offset, checksum(payload, csum))
+
+    # Prepare IP header
+    header = bytearray(struct.pack('!BBHHHBBH', 0x45, 0, 20 + len(payload), 0, 0, REPLY_HLIM, proto, 0)
+                       + src + probe.src)
+    struct.pack_into('!H', header, 10, checksum(header))
+    return ethernet(probe, ETH_P_IP) + header + payload
+
+
+def ethernet(probe, ethertype):
+    """ Craft Ethernet header towards probe source.
+    """
+    return bytes(probe.frame[6:12]) + bytes(probe.frame[0:6]) + struct.pack('!H', ethertype)
+
+
+def packet_end(probe):
+    """ Return end offset of IP packet within frame (excluding Ethernet padding).
+    """
+    if probe.version == 6:
+        length = 40 + struct.unpack_from('!H', probe.frame, probe.l3 + 4)[0]
+    else:
+        length = struct.unpack_from('!H', probe.frame, probe.l3 + 2)[0]
+    return min(len(probe.frame), probe.l3 + length)
+
+
+############
+# CHECKSUM #
+############
+
+def checksum_add(data):
+    """ Compute partial one's complement sum of given (even-length) data (modulo 0xffff).
+    """
+    # Each 16-bit word contributes its value modulo 0xffff (as 2**16 = 1 modulo 0xffff)
+    return int.from_bytes(data, 'big') % 0xffff
+
+
+def checksum(data, csum=0):
+    """ Compute internet checksum (RFC 1071) over given data and partial sum.
+    """
+    # Pad odd-length data
+    if len(data) % 2 == 1:
+        data = bytes(data) + b'\x00'
+
+    # Fold and complement sum
+    return checksum_fold(csum + checksum_add(data))
+
+
+def checksum_fold(csum):
+    """ Fold and complement partial sum into internet checksum.
+    """
+    csum %= 0xffff
+    return 0xffff if csum == 0 else 0xffff - csum
+
+
+def checksum_update(csum, old, new):
+    """ Update internet checksum for covered data changing from <old> to <new> partial sum (RFC 1624, eqn. 3).
+    """
+    # HC' = ~(~HC + ~m + m')
+    return checksum_fold((0xffff - csum) + (0xffff - old % 0xffff) + new)
+
+
+#############
+# TEMPLATES #
+#############
+
+class ReplyTemplate:
+    """ Preallocated ICMP/ICMPv6 error reply quoting the invoking packet.
+
+    Constant header fields are written once and their contribution to the checksums is precomputed. Per reply, only
+    Ethernet/IP addresses, lengths and the quoted packet are written into the buffer and added to the checksums. Each
+    thread builds replies in its own copy of the buffer, so replies of concurrent threads never mix.
+    """
+    def __init__(self, version, icmp_type, icmp_code):
+        """ Initialize reply template.
+        """
+        # Prepare internals
+        self.version = version
+        self.l4 = 54 if version == 6 else 34
+        self.quote_max = QUOTE_MAX_IPV6 if version == 6 else QUOTE_MAX_IPV4
+        self.buffer = bytearray(self.l4 + 8 + self.quote_max)
+        self.local = threading.local()
+
+        # Write constant IPv6 header fields
+        if version == 6:
+            struct.pack_into('!HIHBB', self.buffer, 12, ETH_P_IPV6, 6 << 28, 0, IPPROTO_ICMPV6, REPLY_HLIM)
+            self.ip_sum = 0
+            self.icmp_sum = (icmp_type << 8) + icmp_code + IPPROTO_ICMPV6
+
+        # Write constant IPv4 header fields
+        else:
+            struct.pack_into('!HBBHHHBB', self.buffer, 12, ETH_P_IP, 0x45, 0, 0, 0, 0, REPLY_HLIM, IPPROTO_ICMP)
+            self.ip_sum = 0x4500 + (REPLY_HLIM << 8) + IPPROTO_ICMP
+            self.icmp_sum = (icmp_type << 8) + icmp_code
+
+        # Write ICMP type and code
+        self.buffer[self.l4] = icmp_type
+        self.buffer[self.l4 + 1] = icmp_code
+
+    def build(self, probe, src):
+        """ Build reply for given probe from given source address.
+        """
+        # Write Ethernet addresses and quoted packet (into the buffer of the calling thread)
+        buffer, view = self.thread_buffer()
+        frame, l4 = probe.frame, self.l4
+        end = min(packet_end(probe), probe.l3 + self.quote_max)
+        length = 8 + end - probe.l3
+        buffer[0:6], buffer[6:12] = frame[6:12], frame[0:6]
+        buffer[l4 + 8:l4 + length] = frame[probe.l3:end]
+        if length % 2 == 1:
+            buffer[l4 + length] = 0
+
+        # Write IPv6 header fields (checksum covers pseudo header)
+        csum = self.icmp_sum + checksum_add(view[l4 + 8:l4 + length + length % 2])
+        if self.version == 6:
+            struct.pack_into('!H', buffer, 18, length)
+            buffer[22:38], buffer[38:54] = src, probe.src
+            csum += checksum_add(src) + checksum_add(probe.src) + length
+
+        # Write IPv4 header fields (and header checksum)
+        else:
+            buffer[26:30], buffer[30:34] = src, probe.src
+            ip_sum = self.ip_sum + 20 + length + checksum_add(src) + checksum_add(probe.src)
+            struct.pack_into('!HHHBBH', buffer, 16, 20 + length, 0, 0, REPLY_HLIM, IPPROTO_ICMP, checksum_fold(ip_sum))
+
+        # Write ICMP checksum and return reply
+        struct.pack_into('!H', buffer, l4 + 2, checksum_fold(csum))
+        return bytes(view[:l4 + length])
+
+    def thread_buffer(self):
+        """ Return buffer of the calling thread and a memoryview on it (copied from the template on first use).
+        """
+        local = self.local
+        buffer = getattr(local, 'buffer', None)
+        if buffer is None:
+            buffer = local.buffer = bytearray(self.buffer)
+            local.view = memoryview(buffer)
+        return buffer, local.view
+
+
+# Reply templates (by IP version)
+TEMPLATES_TIME_EXCEEDED = {
+    6: ReplyTemplate(6, ICMPV6_TIME_EXCEEDED, 0),
+    4: ReplyTemplate(4, ICMP_TIME_EXCEEDED, 0),
+}
+TEMPLATES_PORT_UNREACHABLE = {
+    6: ReplyTemplate(6, ICMPV6_UNREACH, ICMPV6_UNREACH_PORT),
+    4: ReplyTemplate(4, ICMP_UNREACH, ICMP_UNREACH_PORT),
+}
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import cProfile
+import os
+import signal
+import sys
+import threading
+import time
+
+# Local imports
+from wumpus.const import PROFILE_DIR
+from wumpus.const import PROFILE_RATE
+from wumpus.const import PROFILE_WINDOW
+from wumpus.iputil import ip2key
+
+
+class Profiler:
+    """ Sample stacks of the serving thread for a bounded window, switched on and off at runtime by signal.
+
+    Samples are aggregated by stack and written in collapsed format (one 'frame;frame;... count' line per stack, as
+    read by flamegraph.pl and speedscope) once the window ends or profiling is switched off. While sampling, probes
+    of clients listed in the optional clients file (one address per line, read when profiling is switched on) are
+    profiled deterministically as well (see ClientTracer), without slowing down any other client.
+    """
+    def __init__(self, directory=PROFILE_DIR, rate=PROFILE_RATE, window=PROFILE_WINDOW, clients=None):
+        """ Initialize profiler writing to given directory (sampling at <rate> Hz for up to <window> seconds).
+        """
+        # Prepare internals
+        self.directory = directory
+        self.rate = rate
+        self.window = window
+        self.clients = clients
+        self.game = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def install(self, game, signum=signal.SIGUSR2):
+        """ Switch profiling of given game engine on and off by given signal.
+        """
+        self.game = game
+        signal.signal(signum, lambda *_: self.toggle())
+
+    def toggle(self):
+        """ Start profiling (or stop it if running).
+        """
+        if self.thread is not None and self.thread.is_alive() is True:
+            self.stop()
+            return
+        self.start()
+
+    def start(self):
+        """ Start sampling the calling thread (and tracing selected clients).
+        """
+        # Trace probes of selected clients
+        if self.clients is not None:
+            self.game.tracer = ClientTracer(load_clients(self.clients))
+
+        # Sample stacks in background
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample, args=(threading.get_ident(), ), name='wumpus-profiler',
+                                       daemon=True)
+        self.thread.start()
+        self.game.log_debug(f'PROFILE [state=started, rate={self.rate}Hz, window={self.window}s]')
+
+    def stop(self):
+        """ Stop profiling early (profiles are written by the sampling thread).
+        """
+        self.stopped.set()
+
+    def sample(self, ident):
+        """ Sample stacks of given thread until stopped or the window ends and write profiles.
+        """
+        # Count collapsed stacks
+        stacks = dict()
+        deadline = time.monotonic() + self.window
+        while self.stopped.wait(1.0 / self.rate) is False and time.monotonic() < deadline:
+            frame = sys._current_frames().get(ident, None)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+            stack = collapse(frame)
+            stacks[stack] = stacks.get(stack, 0) + 1
+
+        # Write sampled stacks
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'wumpus-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}')
+        with open(f'{path}.collapsed', 'w', encoding='utf-8') as fh:
+            fh.writelines(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+        # Stop tracing clients and write their profile
+        tracer, self.game.tracer = self.game.tracer, None
+        if tracer is not None:
+            tracer.dump(f'{path}.pstats')
+        self.game.log_debug(f'PROFILE [state=stopped, samples={sum(stacks.values())}, path={path}]')
+
+
+class ClientTracer:
+    """ Profile probes of selected clients (identified by 16 byte client keys) with cProfile.
+    """
+    def __init__(self, clients):
+        """ Initialize tracer of given client keys.
+        """
+        # Prepare internals
+        self.clients = clients
+        self.profile = cProfile.Profile()
+        self.lock = threading.Lock()
+        self.active = False
+
+    def traces(self, client):
+        """ Check if probes of given client are to be profiled (unless already profiling).
+        """
+        return client in self.clients and self.active is False
+
+    def run(self, func, *args):
+        """ Profile call of given function.
+        """
+        with self.lock:
+            self.active = True
+            self.profile.enable()
+            try:
+                return func(*args)
+            finally:
+                self.profile.disable()
+                self.active = False
+
+    def dump(self, path):
+        """ Write profile statistics to given file (see pstats module).
+        """
+        with self.lock:
+            self.profile.dump_stats(path)
+
+
+###########
+# HELPERS #
+###########
+
+def collapse(frame):
+    """ Return collapsed stack ('file:function' frames from the outermost frame on, separated by ';').
+    """
+    frames = list()
+    while frame is not None:
+        frames.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+def load_clients(path):
+    """ Load client keys from file with one address per line (skipping empty lines and comments).
+    """
+    clients = set()
+    with open(path, 'r', encoding='utf-8') as fh:
+        for line in fh:
+            line = line.split('#', 1)[0].strip()
+            if len(line) > 0:
+                clients.add(ip2key(line))
+    return clients
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+Author Leonhard RABEL <rabel@leitwert.net>
+"""
+
+# System imports
+import bisect
+import itertools
+import os
+import threading
+import time
+
+# Local imports
+from wumpus.const import CSV_HIGHSCORE
+from wumpus.const import CSV_HIGHSCORE_TOP
+from wumpus.const import MAX_HIGHSCORE
+from wumpus.iputil import ip2key
+from wumpus.iputil import key2ip
+from wumpus.log import Logger
+
+# Batched fsync interval of the highscore log (in seconds)
+SCORE_FLUSH_INTERVAL = 5.0
+
+# Snapshot interval of the top entries (in seconds)
+SCORE_SNAPSHOT_INTERVAL = 300
+
+
+class HighScore:
+    """ Keep track of the best durations of the top players (identified by 16 byte client keys).
+
+    Only the top <size> players are kept (in a sorted list updated on each new score), so memory and the work per
+    score are bounded independent of the number of players that ever scored. Every score is appended to the highscore
+    log (synced to disk in batches) and the top entries are periodically saved to a snapshot file along with the log
+    size (by the logger's background thread, off the request path). At startup, only log lines appended after the
+    latest snapshot are replayed.
+
+    The table is guarded by its own lock, so game threads may add scores concurrently (independent of session locks).
+    """
+    def __init__(self, path=CSV_HIGHSCORE, snapshot=CSV_HIGHSCORE_TOP, size=MAX_HIGHSCORE, logger=None):
+        """ Initialize highscore (and load snapshot and log tail).
+        """
+        # Prepare internals
+        self.path = path
+        self.snapshot = snapshot
+        self.size = size
+        self.entries = list()
+        self.best = dict()
+        self.counter = itertools.count()
+        self.version = 0
+        self.logger = logger if logger is not None else Logger(flush_interval=SCORE_FLUSH_INTERVAL, fsync=True)
+        self.last_save = time.time()
+        self.lock = threading.RLock()
+        self.save_lock = threading.Lock()
+
+        # Load highscore
+        self.load()
+
+    def add(self, player, duration, ts=None):
+        """ Log score of given player and update top entries (returns True if the top entries changed).
+        """
+        with self.lock:
+            # Append score to log
+            ts = time.time() if ts is None else ts
+            self.logger.write(self.path, f'{int(ts)},{key2ip(player)},{duration:.3f}')
+
+            # Update top entries and save snapshot periodically (in the background)
+            changed = self.update(player, duration)
+            if ts - self.last_save >= SCORE_SNAPSHOT_INTERVAL:
+                self.last_save = ts
+                self.logger.call(self.save)
+            return changed
+
+    def update(self, player, duration):
+        """ Update top entries with score of given player (returns True if the top entries changed).
+        """
+        with self.lock:
+            # Skip scores not improving the player's best duration (or not making it to the top)
+            current = self.best.get(player, None)
+            if current is not None and duration >= current[0]:
+                return False
+            if current is None and len(self.entries) >= self.size and duration >= self.entries[-1][0]:
+                return False
+
+            # Replace player's entry (keeping earlier entries first for equal durations)
+            if current is not None:
+                del self.entries[bisect.bisect_left(self.entries, current)]
+            entry = (duration, next(self.counter), player)
+            bisect.insort(self.entries, entry)
+            self.best[player] = entry
+
+            # Drop entries beyond top size
+            while len(self.entries) > self.size:
+                del self.best[self.entries.pop()[2]]
+            self.version += 1
+            return True
+
+    def top(self):
+        """ Return (player, duration) tuples of top players ordered by duration.
+        """
+        with self.lock:
+            return [(player, duration) for duration, _, player in self.entries]
+
+    def revision(self):
+        """ Return version of top entries (incremented whenever they change, e.g. to invalidate rendered output).
+        """
+        return self.version
+
+    def load(self):
+        """ Load top entries from snapshot and replay log lines appended afterwards.
+        """
+        # Load snapshot (ignored if the log was truncated or rotated since)
+        offset = 0
+        if os.path.isfile(self.snapshot) is True:
+            with open(self.snapshot, 'r', encoding='utf-8') as fh:
+                offset = int(fh.readline().strip().split(',')[1])
+                if os.path.isfile(self.path) is False or os.path.getsize(self.path) < offset:
+                    offset = 0
+                else:
+                    for line in fh:
+                        player, duration = line.strip().split(',')
+                        self.update(ip2key(player), float(duration))
+
+        # Replay log tail (skipping incomplete lines)
+        if os.path.isfile(self.path) is True:
+            with open(self.path, 'rb') as fh:
+                fh.seek(offset)
+                for line in fh:
+                    try:
+                        _, player, duration = line.decode('utf-8').strip().split(',')
+                        self.update(ip2key(player), float(duration))
+                    except ValueError:
+                        continue
+
+    def save(self):
+        """ Sync log to disk and atomically replace snapshot of top entries.
+
+        The table is not locked while writing (only concurrent saves are serialized): scores added after the log was
+        synced may already be part of the snapshot, but replaying their log lines at startup does not change the top
+        entries again.
+        """
+        with self.save_lock:
+            # Flush pending log lines (before taking top entries, so these include all scores up to the log offset)
+            self.logger.flush()
+            offset = os.path.getsize(self.path) if os.path.isfile(self.path) is True else 0
+            top = self.top()
+
+            # Write snapshot (creating its directory if missing)
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot)), exist_ok=True)
+            tmp_path = f'{self.snapshot}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as fh:
+                fh.write(f'offset,{offset}\n')
+                fh.writelines(f'{key2ip(player)},{duration:.3f}\n' for player, duration in top)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, self.snapshot)
+
+    def close(self):
+        """ Flush log and save snapshot.
+        """
+        self.save()
+        self.logger.close()
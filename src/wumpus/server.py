@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import concurrent.futures
+import contextlib
+import glob
+import multiprocessing
+import multiprocessing.managers
+import os
+import signal
+import sys
+
+# Local imports
+from wumpus.capture import Capture
+from wumpus.capture import CAPTURE_BATCH
+from wumpus.capture import shard_index
+from wumpus.const import TRACE_MAX_HOPS
+from wumpus.game import Game
+from wumpus.iputil import TARGET_IPV4_PACKED
+from wumpus.packet import ETH_P_IP
+from wumpus.packet import ETH_P_IPV6
+from wumpus.packet import destination_reached
+from wumpus.packet import parse
+from wumpus.packet import time_exceeded
+from wumpus.score import HighScore
+from wumpus.shm import SharedSessionStore
+from wumpus.stats import Metrics
+from wumpus.stats import serve_metrics
+
+
+class Server:
+    """ Answer traceroute probes and pings captured on a network interface.
+
+    Batches of frames are optionally handled by a pool of threads (with a game engine handling input concurrently,
+    see Game). Threads only run in parallel on free-threaded Python builds, with the global interpreter lock they merely
+    take turns.
+    """
+    def __init__(self, game, capture, threads=None):
+        """ Initialize server (handling frames in given number of threads if given).
+        """
+        # Prepare internals
+        self.game = game
+        self.capture = capture
+        self.running = False
+        self.threads = threads
+        self.pool = None
+        if threads is not None:
+            self.pool = concurrent.futures.ThreadPoolExecutor(threads, thread_name_prefix='wumpus-game')
+
+    def run(self, timeout=1.0):
+        """ Receive, handle and answer frames until stopped.
+        """
+        # Handle batches of frames (and write session snapshots periodically)
+        self.running = True
+        while self.running is True:
+            frames = self.capture.recv_batch(timeout)
+            if len(frames) > 0:
+                self.capture.send_batch(self.handle_batch(frames))
+            self.game.checkpoint()
+
+    def stop(self):
+        """ Stop server loop.
+        """
+        self.running = False
+
+    def close(self):
+        """ Stop thread pool (if any).
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def handle_batch(self, frames):
+        """ Handle batch of frames and return reply frames.
+
+        With a thread pool, the batch is split into one share per thread by client address (as between worker
+        processes, see capture.bpf_fanout()), so frames of each client are still handled in order by a single thread.
+        """
+        # Handle frames in this thread
+        if self.pool is None:
+            return self.handle_frames(frames)
+
+        # Split frames by client
+        shares = [list() for _ in range(self.threads)]
+        for frame in frames:
+            shares[frame_shard(frame, self.threads)].append(frame)
+
+        # Collect replies of all shares
+        replies = list()
+        for share_replies in self.pool.map(self.handle_frames, [share for share in shares if len(share) > 0]):
+            replies += share_replies
+        return replies
+
+    def handle_frames(self, frames):
+        """ Handle frames and return reply frames.
+
+        Probes taking part in the game are passed to the game engine in one batch (see Game.handle_batch()), so probes
+        of each client are still handled in order.
+        """
+        # Parse frames (answering probes not taking part in the game right away)
+        replies, probes = list(), list()
+        for frame in frames:
+            try:
+                probe = parse(frame)
+                if probe is None:
+                    continue
+                if self.in_game(probe) is True:
+                    probes.append(probe)
+                    continue
+                reply = destination_reached(probe, probe.dst) if probe.echo is True else None
+            except Exception as error:  # pylint: disable=broad-except
+                self.game.log_error(f'FRAME [error={error!r}]')
+                continue
+            if reply is not None:
+                replies.append(reply)
+
+        # Determine hops of all game probes at once (dropping them on failure, as some may have been handled already)
+        try:
+            hops = self.game.handle_batch([(probe.src, probe.dst, probe.proto) for probe in probes], packed=True)
+        except Exception as error:  # pylint: disable=broad-except
+            self.game.log_error(f'BATCH [error={error!r}]')
+            return replies
+
+        # Reply from hops
+        for probe, probe_hops in zip(probes, hops):
+            try:
+                reply = self.hop_reply(probe, probe_hops)
+            except Exception as error:  # pylint: disable=broad-except
+                self.game.log_error(f'FRAME [error={error!r}]')
+                continue
+            if reply is not None:
+                replies.append(reply)
+
+        # Return replies
+        return replies
+
+    def handle_frame(self, frame):
+        """ Handle single frame and return reply frame (or None).
+        """
+        # Parse probe
+        probe = parse(frame)
+        if probe is None:
+            return None
+
+        # Answer probes not taking part in the game without involving the game
+        if self.in_game(probe) is False:
+            return destination_reached(probe, probe.dst) if probe.echo is True else None
+
+        # Determine hops for probe target
+        return self.hop_reply(probe, self.game.handle_input(probe.src, probe.dst, probe.proto, packed=True))
+
+    @staticmethod
+    def in_game(probe):
+        """ Check if given probe takes part in the game (plain pings and probes to other IPv4 addresses do not).
+        """
+        if probe.echo is True and probe.hlim > TRACE_MAX_HOPS:
+            return False
+        return probe.version == 6 or probe.dst == TARGET_IPV4_PACKED
+
+    @staticmethod
+    def hop_reply(probe, hops):
+        """ Return reply frame from hop (or destination) matching remaining hop limit of given probe (or None).
+        """
+        # Ignore probes without hops
+        if len(hops) == 0:
+            return None
+
+        # Reply from hop (or destination) matching remaining hop limit (not from empty hops, e.g. of highscore screens)
+        hlim = max(probe.hlim, 1)
+        if hlim < len(hops):
+            hop = hops[hlim - 1]
+            return time_exceeded(probe, hop) if hop is not None and len(hop) == len(probe.src) else None
+        hop = hops[-1]
+        return destination_reached(probe, hop) if hop is not None and len(hop) == len(probe.src) else None
+
+
+###########
+# SERVING #
+###########
+
+def serve(interface, batch=CAPTURE_BATCH, fanout=None, highscore=None, shard=None, snapshot=None,
+          sessions_table=None, metrics=None, profiler=None, threads=None, **options):
+    """ Serve probes on given interface (optionally as shard (n_shard, n_shards) of a fanout group).
+
+    Sessions are restored from the given snapshot file at startup and written back periodically and on termination.
+    Shards write one snapshot file each (suffixed by the shard number), but restore their clients from all of them.
+    Alternatively, sessions are kept in a memory-mapped table file handed over between processes (see shm module),
+    while probes of a client are still steered to a single process.
+
+    Metrics are optionally exported on a given address (see stats.serve_metrics()), with one endpoint per shard. A
+    given profiler is switched on and off by SIGUSR2 (see profiler.Profiler).
+
+    With a given number of threads, frames are handled by a thread pool (see Server).
+    """
+    # Open shared session table (outliving restarts on its own, so no snapshots needed)
+    sessions = None
+    if sessions_table is not None:
+        sessions, snapshot = SharedSessionStore(sessions_table), None
+
+    # Select snapshot files
+    paths = [snapshot]
+    if snapshot is not None and shard is not None:
+        paths = snapshot_paths(snapshot)
+        snapshot = f'{snapshot}.{shard[0]}'
+
+    # Prepare game engine (restoring sessions) and server
+    game = Game(highscore=highscore, snapshot=snapshot, sessions=sessions,
+                metrics=Metrics() if metrics is not None else None, concurrent=threads is not None, **options)
+    if snapshot is not None:
+        game.load_sessions(paths, shard)
+    server = Server(game, Capture(interface, batch=batch, fanout=fanout), threads=threads)
+
+    # Export metrics and install profiler
+    if metrics is not None:
+        serve_metrics(metrics_address(metrics, shard), game.export_metrics)
+    if profiler is not None:
+        profiler.install(game)
+
+    # Serve until interrupted or terminated (writing sessions and flushing buffered log lines, each step run even if
+    # an earlier one fails)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with contextlib.ExitStack() as stack:
+            if highscore is None:
+                stack.callback(game.highscore.close)
+            stack.callback(game.logger.close)
+            if snapshot is not None:
+                stack.callback(game.save_sessions)
+            stack.callback(server.close)
+
+
+class ScoreManager(multiprocessing.managers.BaseManager):
+    """ Manager process owning the highscore shared by worker processes.
+    """
+
+
+ScoreManager.register('HighScore', HighScore)
+
+
+def serve_sharded(interface, n_shards, batch=CAPTURE_BATCH, **options):
+    """ Serve probes on given interface with one worker process per shard.
+
+    The kernel steers frames to workers by client address (see capture.bpf_fanout()), so each worker owns the
+    sessions of its clients (and answers their repeated probes from its own cache). The highscore is kept (and logged)
+    by a manager process and shared between workers.
+    """
+    # Terminate workers along with this process
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    # Create shared session table before starting workers
+    if options.get('sessions_table', None) is not None:
+        SharedSessionStore(options['sessions_table']).close()
+
+    # Share highscore between workers (leaving interrupts to this process)
+    manager = ScoreManager()
+    manager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+    with manager:
+        highscore = manager.HighScore()
+
+        # Start one worker per shard
+        fanout = (os.getpid(), n_shards)
+        workers = [multiprocessing.Process(target=serve, args=(interface, batch, fanout, highscore),
+                                           kwargs=dict(options, shard=(n_shard, n_shards)),
+                                           name=f'wumpus-shard-{n_shard}', daemon=True)
+                   for n_shard in range(n_shards)]
+        for worker in workers:
+            worker.start()
+
+        # Pass profiler signals on to workers
+        if options.get('profiler', None) is not None:
+            signal.signal(signal.SIGUSR2, lambda *_: [os.kill(worker.pid, signal.SIGUSR2) for worker in workers])
+
+        # Wait for workers
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+            highscore.close()
+
+
+def frame_shard(frame, n_shards):
+    """ Return share of given frame by client (source) address (see capture.shard_index(), first share if malformed).
+    """
+    ethertype = (frame[12] << 8) | frame[13] if len(frame) >= 14 else None
+    if ethertype == ETH_P_IPV6 and len(frame) >= 38:
+        return shard_index(frame[22:38], n_shards)
+    if ethertype == ETH_P_IP and len(frame) >= 30:
+        return shard_index(frame[26:30], n_shards)
+    return 0
+
+
+def metrics_address(address, shard=None):
+    """ Return metrics address of given shard (next ports or suffixed Unix socket paths).
+    """
+    if shard is None:
+        return address
+    if address.startswith('/') is False and ':' in address:
+        host, port = address.rsplit(':', 1)
+        return f'{host}:{int(port) + shard[0]}'
+    return f'{address}.{shard[0]}'
+
+
+def snapshot_paths(snapshot):
+    """ Return snapshot files of all shards for given snapshot file.
+    """
+    return sorted(path for path in glob.glob(f'{glob.escape(snapshot)}.*') if path.rsplit('.', 1)[1].isdigit() is True)
@@ -11,24 +11,78 @@ Author Leonhard RABEL <rabel@leitwert.net>
 """
 
 # System imports
-import random
+import hashlib
+import math
+import os
+import struct
 import time
 
 # Local imports
 from wumpus.const import ROOMS
 from wumpus.const import GAME_TIMEOUT
 from wumpus.const import Output
+from wumpus.iputil import key2ip
+
+# Packed session record (client key, initial entities, entities, ammo, help page, flags, game number, random counter,
+# start, duration, update)
+SESSION_RECORD = struct.Struct('<16s6B6BBbBIIddd')
+
+# Session record flags (and their offset within records)
+SESSION_FLAGS_OFFSET = struct.calcsize('<16s6B6BBb')
+SESSION_SCORES = 0x01
+SESSION_LIVE = 0x02
+SESSION_LOST = 0x04
+SESSION_WON = 0x08
+
+# Packed placeholder for missing entities
+NO_ENTITIES = (0, ) * 6
+
+# Session random streams (keyed hash of client, stream, game number and counter)
+RANDOM_DATA = struct.Struct('<BIQ')
+RANDOM_DIGEST_SIZE = 8
+RANDOM_PLACE = 0
+RANDOM_PLAY = 1
+
+
+class Entities:
+    """ Keep track of entity locations.
+    """
+    __slots__ = ('player', 'wumpus', 'pit1', 'pit2', 'bat1', 'bat2')
+
+    def __init__(self, player, wumpus, pit1, pit2, bat1, bat2):
+        """ Initialize entity locations.
+        """
+        # Prepare internals
+        self.player = player
+        self.wumpus = wumpus
+        self.pit1 = pit1
+        self.pit2 = pit2
+        self.bat1 = bat1
+        self.bat2 = bat2
 
 
 class Session:
     """ Keep track of player's game session.
+
+    Sessions (and their entities) use slots instead of per-instance dicts, as one session is kept per active player.
     """
-    def __init__(self, log, client):
-        """ Initialize game session.
+    __slots__ = ('log', 'client', 'key', 'game', 'counter', 'initial_entities', 'entities', 'start_time', 'duration',
+                 'last_update', 'last_help', 'scores', 'live', 'lost', 'won', 'ammo')
+
+    def __init__(self, log, client, key=None):
+        """ Initialize game session (drawing random numbers keyed by given random key, see random_key()).
+
+        Random numbers are derived from the server secret, the client, the game number and a counter of numbers drawn
+        within the game, so the same session state and command always yield the same outcome. Game numbers start at
+        the session creation time (in seconds), so games do not repeat for clients returning after their session
+        expired.
         """
         # Prepare internals
         self.log = log
         self.client = client
+        self.key = key if key is not None else RANDOM_KEY
+        self.game = int(time.time()) & 0xffffffff
+        self.counter = 0
         self.initial_entities = None
         self.entities = None
         self.start_time = None
@@ -57,31 +111,25 @@ class Session:
         if self.start_time is None:
             self.start_time = time.time()
 
-        # Place entities
+        # Restart random stream of game
+        self.counter = 0
+
+        # Place entities (in distinct rooms of a new game's random stream)
         if entities is None:
-            entities = random.sample(range(1, len(ROOMS) + 1), 6)
+            self.game = (self.game + 1) & 0xffffffff
+            rooms = list(range(1, len(ROOMS) + 1))
+            for n_entity in range(6):
+                n_room = n_entity + self.draw(len(rooms) - n_entity, RANDOM_PLACE, n_entity)
+                rooms[n_entity], rooms[n_room] = rooms[n_room], rooms[n_entity]
+            entities = tuple(rooms[:6])
             self.initial_entities = entities
             self.scores = True
 
-        class Entities:
-            """ Keep track of entity locations.
-            """
-            def __init__(self, player, wumpus, pit1, pit2, bat1, bat2):
-                """ Initialize entity locations.
-                """
-                # Prepare internals
-                self.player = player
-                self.wumpus = wumpus
-                self.pit1 = pit1
-                self.pit2 = pit2
-                self.bat1 = bat1
-                self.bat2 = bat2
-
         # Create entities
         self.entities = Entities(*entities)
 
     def reset(self):
-        """ Create new session with previous entities.
+        """ Create new session with previous entities (replaying the game's random stream).
         """
         # Invoke session creation
         return self.new(entities=self.initial_entities)
@@ -94,6 +142,56 @@ class Session:
         self.entities = None
         self.live = False
 
+    def pack(self):
+        """ Pack session into fixed size record (see SESSION_RECORD).
+        """
+        # Collect entity locations
+        initial_entities = self.initial_entities if self.initial_entities is not None else NO_ENTITIES
+        entities = NO_ENTITIES
+        if self.entities is not None:
+            entities = (self.entities.player, self.entities.wumpus, self.entities.pit1, self.entities.pit2,
+                        self.entities.bat1, self.entities.bat2)
+
+        # Collect flags
+        flags = ((SESSION_SCORES if self.scores is True else 0) | (SESSION_LIVE if self.live is True else 0) |
+                 (SESSION_LOST if self.lost is True else 0) | (SESSION_WON if self.won is True else 0))
+
+        # Pack record (missing times as NaN)
+        return SESSION_RECORD.pack(self.client, *initial_entities, *entities, self.ammo, self.last_help, flags,
+                                   self.game, self.counter,
+                                   self.start_time if self.start_time is not None else math.nan,
+                                   self.duration if self.duration is not None else math.nan, self.last_update)
+
+    @classmethod
+    def unpack(cls, log, record, offset=0, key=None):
+        """ Unpack session from fixed size record (at given offset of <record>, see SESSION_RECORD).
+        """
+        # Unpack record
+        fields = SESSION_RECORD.unpack_from(record, offset)
+        session = cls(log, fields[0], key)
+
+        # Restore entity locations
+        if fields[1] != 0:
+            session.initial_entities = fields[1:7]
+        if fields[7] != 0:
+            session.entities = Entities(*fields[7:13])
+
+        # Restore counters and flags
+        session.ammo, session.last_help, flags = fields[13:16]
+        session.scores = flags & SESSION_SCORES != 0
+        session.live = flags & SESSION_LIVE != 0
+        session.lost = flags & SESSION_LOST != 0
+        session.won = flags & SESSION_WON != 0
+
+        # Restore random stream
+        session.game, session.counter = fields[16:18]
+
+        # Restore times (missing times stored as NaN)
+        session.start_time = fields[18] if math.isnan(fields[18]) is False else None
+        session.duration = fields[19] if math.isnan(fields[19]) is False else None
+        session.last_update = fields[20]
+        return session
+
     def update(self):
         """ Update session.
         """
@@ -109,6 +207,19 @@ class Session:
             self.live = False
         return expired
 
+    def draw(self, n, stream=RANDOM_PLAY, counter=None):
+        """ Draw random number in range(n) from given stream of the current game (at the next counter by default).
+        """
+        # Advance counter of play stream
+        if counter is None:
+            counter = self.counter
+            self.counter += 1
+
+        # Derive number from keyed hash
+        digest = self.key.copy()
+        digest.update(self.client + RANDOM_DATA.pack(stream, self.game, counter))
+        return int.from_bytes(digest.digest(), 'little') % n
+
     ##########
     # OUTPUT #
     ##########
@@ -203,12 +314,13 @@ class Session:
     def output_state(self, initial=False):
         """ Output current state (optionally including initial text).
         """
-        # Output debug messages
+        # Output debug messages (formatted lazily)
         win_loss = 'win, ' if self.won is True else ('loss, ' if self.lost is True else '')
-        self.log(f'STATE [client={self.client}, {win_loss}player={self.entities.player}, wumpus={self.entities.wumpus}, '
-                 f'pits=({",".join(str(r) for r in sorted(set([self.entities.pit1, self.entities.pit2])))}), '
-                 f'bats=({",".join(str(r) for r in sorted(set([self.entities.bat1, self.entities.bat2])))}), '
-                 f'arrows={self.ammo}]')
+        self.log(lambda: f'STATE [client={key2ip(self.client)}, {win_loss}player={self.entities.player}, '
+                         f'wumpus={self.entities.wumpus}, '
+                         f'pits=({",".join(str(r) for r in sorted(set([self.entities.pit1, self.entities.pit2])))}), '
+                         f'bats=({",".join(str(r) for r in sorted(set([self.entities.bat1, self.entities.bat2])))}), '
+                         f'arrows={self.ammo}]')
 
         # Player already won
         if self.won is True:
@@ -303,11 +415,12 @@ class Session:
             old_pos = current_pos
 
             # Move arrow to selected room if valid or random neighboring room otherwise
-            current_pos = room if room in ROOMS[current_pos] else random.choice(ROOMS[current_pos])
+            current_pos = room if room in ROOMS[current_pos] else ROOMS[current_pos][self.draw(3)]
 
-            # Output debug messages
-            self.log(f'SHOT [client={self.client}, room={room}, valid=({",".join(str(r) for r in ROOMS[old_pos])}), '
-                     f'shot={current_pos}, wumpus={self.entities.wumpus}]')
+            # Output debug messages (formatted lazily)
+            self.log(lambda: f'SHOT [client={key2ip(self.client)}, room={room}, '
+                             f'valid=({",".join(str(r) for r in ROOMS[old_pos])}), '
+                             f'shot={current_pos}, wumpus={self.entities.wumpus}]')
 
             # Arrow hit wumpus
             if current_pos == self.entities.wumpus:
@@ -351,8 +464,9 @@ class Session:
 
         # Handle bats
         if self.entities.player in {self.entities.bat1, self.entities.bat2}:
-            player = random.choice(list(set(range(1, len(ROOMS) + 1)) - {self.entities.bat1, self.entities.bat2}))
-            self.entities.player = player
+            bats = {self.entities.bat1, self.entities.bat2}
+            rooms = [room for room in range(1, len(ROOMS) + 1) if room not in bats]
+            self.entities.player = rooms[self.draw(len(rooms))]
             return [Output.GAME_EMPTY, Output.ACTION_MOVE_BAT] + self.hazards()
 
         # No interaction
@@ -362,7 +476,7 @@ class Session:
         """ Move wumpus.
         """
         # Move wumpus with probability 0.25
-        move = random.choice(range(4))
+        move = self.draw(4)
         if move < 3:
             self.entities.wumpus = ROOMS[self.entities.wumpus][move]
 
@@ -375,3 +489,32 @@ class Session:
 
         # Wumpus moved silently
         return list()
+
+
+###########
+# HELPERS #
+###########
+
+def random_key(secret):
+    """ Return random key of given server secret (up to 64 bytes) to derive session random numbers from.
+    """
+    return hashlib.blake2b(key=secret, digest_size=RANDOM_DIGEST_SIZE)
+
+
+def load_secret(path):
+    """ Load server secret from given file (created with a new random secret if missing, along with its directory).
+    """
+    # Create secret file (readable by owner only)
+    if os.path.isfile(path) is False:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(os.urandom(32))
+
+    # Read secret
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+
+# Default random key (secret per process)
+RANDOM_KEY = random_key(os.urandom(32))
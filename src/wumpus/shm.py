@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import contextlib
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+# Local imports
+from wumpus.const import GAME_TIMEOUT
+from wumpus.session import Session
+from wumpus.session import SESSION_RECORD
+
+# Table header (magic, number of buckets)
+SHM_MAGIC = b'WUMPUSM2'
+SHM_HEADER = struct.Struct('<8sQ')
+
+# Table dimensions
+SHM_BUCKETS = 2**18
+SHM_BUCKET_SLOTS = 8
+
+# Slot layout (state byte followed by packed session record)
+SLOT_EMPTY = 0
+SLOT_USED = 1
+SLOT_SIZE = 1 + SESSION_RECORD.size
+BUCKET_SIZE = SHM_BUCKET_SLOTS * SLOT_SIZE
+
+# Last update field within slots
+SLOT_LAST_UPDATE = struct.Struct('<d')
+SLOT_LAST_UPDATE_OFFSET = SLOT_SIZE - SLOT_LAST_UPDATE.size
+
+# Buckets inspected per expiry call
+EXPIRE_BUCKETS = 4
+
+# Thread locks guarding buckets within a process (buckets share locks by bucket number)
+SHM_LOCK_STRIPES = 64
+
+
+class SharedSessionStore:
+    """ Keep track of player sessions in a memory-mapped table shared between processes.
+
+    Each bucket holds a fixed number of slots with packed session records (see Session.pack()), keyed by the 16 byte
+    client key. Clients hash to a single bucket and are looked up within it, so each bucket is guarded by its own
+    file record lock. If a bucket is full, its least recently updated session is replaced. Expired sessions are
+    dropped on access and by an incremental sweep.
+
+    Sessions returned by the store are copies: changes are written back via commit(), which callers do while holding
+    the client's lock (see lock()). Locks are reentrant within a thread: as file record locks are held per process,
+    threads of a process first take a striped thread lock of the bucket.
+
+    The table hands sessions over between processes (across restarts or between workers), but processes do not serve
+    probes of the same client at once: repeated probes of a traceroute run are answered from a per-process cache (see
+    cache.ProbeCache), so all probes of a client need to reach a single process (see capture.bpf_fanout()).
+    """
+    def __init__(self, path, buckets=SHM_BUCKETS, log=None, key=None):
+        """ Initialize session store on given file (created with given number of buckets if missing).
+
+        Processes sharing the table need to share the random key of sessions as well (see session.random_key()).
+        """
+        # Prepare internals
+        self.path = path
+        self.log = log
+        self.key = key
+        self.locks = dict()
+        self.stripes = [threading.RLock() for _ in range(SHM_LOCK_STRIPES)]
+        self.cursor = 0
+        self.evicted = 0
+
+        # Open (or create) table file while holding the header lock
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, SHM_HEADER.size, 0)
+        try:
+            if os.fstat(self.fd).st_size == 0:
+                os.ftruncate(self.fd, SHM_HEADER.size + buckets * BUCKET_SIZE)
+                os.pwrite(self.fd, SHM_HEADER.pack(SHM_MAGIC, buckets), 0)
+            self.mm = mmap.mmap(self.fd, 0)
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, SHM_HEADER.size, 0)
+
+        # Validate table
+        magic, self.buckets = SHM_HEADER.unpack_from(self.mm)
+        if magic != SHM_MAGIC or len(self.mm) != SHM_HEADER.size + self.buckets * BUCKET_SIZE:
+            raise ValueError(f'invalid session table: {path}')
+
+    ###########
+    # LOCKING #
+    ###########
+
+    def bucket(self, key):
+        """ Return bucket offset of given client key.
+        """
+        return SHM_HEADER.size + (zlib.crc32(key) % self.buckets) * BUCKET_SIZE
+
+    def acquire(self, base):
+        """ Lock bucket at given offset (reentrant).
+        """
+        self.stripes[base // BUCKET_SIZE % SHM_LOCK_STRIPES].acquire()
+        count = self.locks.get(base, 0)
+        if count == 0:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, BUCKET_SIZE, base)
+        self.locks[base] = count + 1
+
+    def release(self, base):
+        """ Unlock bucket at given offset (once released as often as acquired).
+        """
+        count = self.locks.pop(base) - 1
+        if count == 0:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, BUCKET_SIZE, base)
+        else:
+            self.locks[base] = count
+        self.stripes[base // BUCKET_SIZE % SHM_LOCK_STRIPES].release()
+
+    @contextlib.contextmanager
+    def lock(self, client):
+        """ Hold lock of given client's bucket.
+        """
+        base = self.bucket(client)
+        self.acquire(base)
+        try:
+            yield
+        finally:
+            self.release(base)
+
+    ##########
+    # ACCESS #
+    ##########
+
+    def find(self, key, base):
+        """ Return offset of used slot holding given client key in bucket (or -1).
+        """
+        # Search key bytes and check slot alignment
+        start, end = base, base + BUCKET_SIZE
+        while True:
+            pos = self.mm.find(key, start, end)
+            if pos < 0:
+                return -1
+            slot = pos - 1
+            if (slot - base) % SLOT_SIZE == 0 and self.mm[slot] == SLOT_USED:
+                return slot
+            start = pos + 1
+
+    def expired(self, slot, now):
+        """ Check if session in given slot has expired.
+        """
+        return now - SLOT_LAST_UPDATE.unpack_from(self.mm, slot + SLOT_LAST_UPDATE_OFFSET)[0] >= GAME_TIMEOUT
+
+    def get(self, client, default=None):
+        """ Return copy of given client's session (dropping expired sessions).
+        """
+        base = self.bucket(client)
+        self.acquire(base)
+        try:
+            slot = self.find(client, base)
+            if slot < 0:
+                return default
+            if self.expired(slot, time.time()) is True:
+                self.mm[slot] = SLOT_EMPTY
+                return default
+            return Session.unpack(self.log, self.mm, slot + 1, key=self.key)
+        finally:
+            self.release(base)
+
+    def add(self, client, session):
+        """ Add (or replace) session of given client.
+        """
+        self.add_packed(client, session.pack())
+
+    def commit(self, client, session):
+        """ Write back changed session of given client.
+        """
+        self.add_packed(client, session.pack())
+
+    def add_packed(self, client, record):
+        """ Add (or replace) session of given client as packed record.
+        """
+        base = self.bucket(client)
+        self.acquire(base)
+        try:
+            # Select client's slot, a free slot or the least recently updated slot
+            slot = self.find(client, base)
+            if slot < 0:
+                slots = range(base, base + BUCKET_SIZE, SLOT_SIZE)
+                slot = next((slot for slot in slots if self.mm[slot] == SLOT_EMPTY), None)
+                if slot is None:
+                    slot = min(slots, key=lambda slot: SLOT_LAST_UPDATE.unpack_from(
+                        self.mm, slot + SLOT_LAST_UPDATE_OFFSET)[0])
+                    self.evicted += 1
+
+            # Write record
+            self.mm[slot + 1:slot + SLOT_SIZE] = record
+            self.mm[slot] = SLOT_USED
+        finally:
+            self.release(base)
+
+    def add_packed_all(self, clients, records):
+        """ Add sessions of given clients as packed records (ordered least recently updated first).
+        """
+        for client, record in zip(clients, records):
+            self.add_packed(client, record)
+
+    def touch(self, client):
+        """ Renew timeout of given client's session (and return a copy of it).
+        """
+        base = self.bucket(client)
+        self.acquire(base)
+        try:
+            slot = self.find(client, base)
+            if slot < 0:
+                return None
+            now = time.time()
+            if self.expired(slot, now) is True:
+                self.mm[slot] = SLOT_EMPTY
+                return None
+            SLOT_LAST_UPDATE.pack_into(self.mm, slot + SLOT_LAST_UPDATE_OFFSET, now)
+            return Session.unpack(self.log, self.mm, slot + 1, key=self.key)
+        finally:
+            self.release(base)
+
+    def expire(self, n_buckets=EXPIRE_BUCKETS):
+        """ Remove expired sessions from the next few buckets (sweeping the table incrementally).
+        """
+        # Sweep buckets from cursor
+        n_expired, now = 0, time.time()
+        for _ in range(n_buckets):
+            base = SHM_HEADER.size + self.cursor * BUCKET_SIZE
+            self.cursor = (self.cursor + 1) % self.buckets
+            self.acquire(base)
+            try:
+                for slot in range(base, base + BUCKET_SIZE, SLOT_SIZE):
+                    if self.mm[slot] == SLOT_USED and self.expired(slot, now) is True:
+                        self.mm[slot] = SLOT_EMPTY
+                        n_expired += 1
+            finally:
+                self.release(base)
+
+        # Return number of removed sessions
+        return n_expired
+
+    def packed(self):
+        """ Iterate packed session records (least recently updated first).
+        """
+        # Collect records of all buckets
+        records = list()
+        for base in range(SHM_HEADER.size, len(self.mm), BUCKET_SIZE):
+            self.acquire(base)
+            try:
+                records += [self.mm[slot + 1:slot + SLOT_SIZE] for slot in range(base, base + BUCKET_SIZE, SLOT_SIZE)
+                            if self.mm[slot] == SLOT_USED]
+            finally:
+                self.release(base)
+
+        # Order records by last update
+        records.sort(key=lambda record: SLOT_LAST_UPDATE.unpack_from(record, SLOT_LAST_UPDATE_OFFSET - 1)[0])
+        return iter(records)
+
+    def close(self):
+        """ Unmap and close table file.
+        """
+        self.mm.close()
+        os.close(self.fd)
+
+    def __getitem__(self, client):
+        """ Return copy of given client's session.
+        """
+        session = self.get(client, None)
+        if session is None:
+            raise KeyError(client)
+        return session
+
+    def __delitem__(self, client):
+        """ Remove session of given client.
+        """
+        base = self.bucket(client)
+        self.acquire(base)
+        try:
+            slot = self.find(client, base)
+            if slot < 0:
+                raise KeyError(client)
+            self.mm[slot] = SLOT_EMPTY
+        finally:
+            self.release(base)
+
+    def __contains__(self, client):
+        """ Check if client has a session (without unpacking it).
+        """
+        base = self.bucket(client)
+        self.acquire(base)
+        try:
+            slot = self.find(client, base)
+            return slot >= 0 and self.expired(slot, time.time()) is False
+        finally:
+            self.release(base)
+
+    def __iter__(self):
+        """ Iterate clients (in table order).
+        """
+        for slot in range(SHM_HEADER.size, len(self.mm), SLOT_SIZE):
+            if self.mm[slot] == SLOT_USED:
+                yield self.mm[slot + 1:slot + 17]
+
+    def __len__(self):
+        """ Return number of sessions (including expired sessions not swept yet).
+        """
+        states = self.mm[SHM_HEADER.size::SLOT_SIZE]
+        return len(states) - states.count(SLOT_EMPTY)
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import math
+import random
+
+# Optional imports
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Local imports
+from wumpus.const import ROOMS
+from wumpus.const import Output
+from wumpus.session import Session
+from wumpus.session import random_key
+
+# Game outcomes (indexed by outcome code)
+OUTCOMES = ('live', 'won', 'pit', 'wumpus', 'self', 'ammo')
+LIVE, WON, PIT, WUMPUS, SELF, AMMO = range(len(OUTCOMES))
+
+# Player policy (probability to shoot per action, maximum rooms per arrow, actions per game)
+SIM_SHOOT = 0.2
+SIM_MAX_SHOTS = 3
+SIM_MAX_ACTIONS = 100
+
+# Games simulated at once (bounding memory of large runs)
+SIM_CHUNK = 2**18
+
+# Deviation (in standard errors) tolerated when comparing with scalar sessions
+SIM_TOLERANCE = 4.0
+
+# Room adjacency (as matrix and as table of neighbors, both indexed by room number)
+N_ROOMS = len(ROOMS)
+if np is not None:
+    ADJACENCY = np.zeros((N_ROOMS + 1, N_ROOMS + 1), dtype=bool)
+    NEIGHBORS = np.zeros((N_ROOMS + 1, 3), dtype=np.int64)
+    for neighbor_room, neighbor_rooms in ROOMS.items():
+        ADJACENCY[neighbor_room, list(neighbor_rooms)] = True
+        NEIGHBORS[neighbor_room] = neighbor_rooms
+
+
+class Simulation:
+    """ Play a batch of games at once with a random player policy (requires numpy).
+
+    Games are represented by arrays of entity locations, ammo and outcome codes, and each action (see move() and
+    shoot()) is applied to all selected games at once with the rules of Session.move(), Session.shoot(),
+    Session.hazards() and Session.wumpus(). Random choices are drawn independently of the scalar implementation, so
+    results agree statistically only (see compare()).
+    """
+    def __init__(self, n_games, rng=None):
+        """ Initialize given number of new games (with a numpy random generator or a new one).
+        """
+        # Check optional dependency
+        if np is None:
+            raise ImportError('numpy is required for simulations')
+
+        # Prepare internals
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.n_games = n_games
+        self.ammo = np.full(n_games, 5, dtype=np.int64)
+        self.outcome = np.full(n_games, LIVE, dtype=np.int64)
+        self.actions = np.zeros(n_games, dtype=np.int64)
+
+        # Place entities (in six distinct rooms per game)
+        entities = np.argsort(self.rng.random((n_games, N_ROOMS)), axis=1)[:, :6] + 1
+        self.player, self.wumpus, self.pit1, self.pit2, self.bat1, self.bat2 = (entities[:, n_entity].copy()
+                                                                              for n_entity in range(6))
+
+    def run(self, shoot=SIM_SHOOT, max_shots=SIM_MAX_SHOTS, max_actions=SIM_MAX_ACTIONS):
+        """ Play all games until finished (or until given number of actions per game).
+        """
+        for _ in range(max_actions):
+            if self.step(shoot, max_shots) == 0:
+                break
+
+    def step(self, shoot=SIM_SHOOT, max_shots=SIM_MAX_SHOTS):
+        """ Let players of live games shoot (with given probability) or move to a random neighboring room.
+
+        Returns the number of live games before the action.
+        """
+        # Select live games and their actions
+        games = np.flatnonzero(self.outcome == LIVE)
+        self.actions[games] += 1
+        shooting = self.rng.random(len(games)) < shoot
+
+        # Shoot arrows through up to <max_shots> distinct random rooms
+        shooters = games[shooting]
+        shots = np.argsort(self.rng.random((len(shooters), N_ROOMS)), axis=1)[:, :max_shots] + 1
+        self.shoot(shooters, shots, self.rng.integers(1, max_shots, size=len(shooters), endpoint=True))
+
+        # Move to random neighboring rooms
+        movers = games[~shooting]
+        self.move(movers, NEIGHBORS[self.player[movers], self.rng.integers(0, 3, size=len(movers))])
+        return len(games)
+
+    def move(self, games, rooms):
+        """ Move players of given games to given rooms (ignoring invalid rooms, see Session.move()).
+        """
+        # Update player locations
+        valid = ADJACENCY[self.player[games], rooms]
+        games = games[valid]
+        self.player[games] = rooms[valid]
+
+        # Interact with hazards and wake wumpus if bumped into
+        games = self.hazards(games)
+        self.wake(games[self.wumpus[games] == self.player[games]])
+
+    def shoot(self, games, shots, n_shots):
+        """ Shoot arrows of given games through the first <n_shots> rooms of each row of <shots> (see Session.shoot()).
+        """
+        # Move arrows room by room (to random neighboring rooms if not adjacent)
+        position = self.player[games]
+        flying = np.ones(len(games), dtype=bool)
+        for n_shot in range(shots.shape[1]):
+            flying &= n_shot < n_shots
+            valid = ADJACENCY[position, shots[:, n_shot]]
+            detour = NEIGHBORS[position, self.rng.integers(0, 3, size=len(games))]
+            position = np.where(flying, np.where(valid, shots[:, n_shot], detour), position)
+
+            # Arrows hit wumpus or player
+            hit = flying & (position == self.wumpus[games])
+            self.outcome[games[hit]] = WON
+            hit_self = flying & ~hit & (position == self.player[games])
+            self.outcome[games[hit_self]] = SELF
+            flying &= ~(hit | hit_self)
+
+        # Use up ammo of missed shots (or wake wumpus)
+        missed = games[self.outcome[games] == LIVE]
+        self.ammo[missed] -= 1
+        self.outcome[missed[self.ammo[missed] == 0]] = AMMO
+        self.wake(missed[self.ammo[missed] > 0])
+
+    def hazards(self, games):
+        """ Let hazards act on players of given games and return games still live (see Session.hazards()).
+        """
+        # Drop players into pits
+        player = self.player[games]
+        pit = (player == self.pit1[games]) | (player == self.pit2[games])
+        self.outcome[games[pit]] = PIT
+        games = games[~pit]
+
+        # Carry players off by bats (to any room without bats, counted past the bat rooms)
+        bats = (self.player[games] == self.bat1[games]) | (self.player[games] == self.bat2[games])
+        if bats.any() == False:  # pylint: disable=singleton-comparison
+            return games
+        carried = games[bats]
+        low = np.minimum(self.bat1[carried], self.bat2[carried])
+        high = np.maximum(self.bat1[carried], self.bat2[carried])
+        room = self.rng.integers(1, N_ROOMS - 2, size=len(carried), endpoint=True)
+        room += room >= low
+        room += room >= high
+        self.player[carried] = room
+
+        # Let hazards act again on carried players
+        return np.concatenate((games[~bats], self.hazards(carried)))
+
+    def wake(self, games):
+        """ Move wumpus of given games with probability 0.75 (see Session.wumpus()).
+        """
+        # Move wumpus to random neighboring rooms
+        move = self.rng.integers(0, 4, size=len(games))
+        moving = games[move < 3]
+        self.wumpus[moving] = NEIGHBORS[self.wumpus[moving], move[move < 3]]
+
+        # Wumpus wins
+        self.outcome[games[self.wumpus[games] == self.player[games]]] = WUMPUS
+
+    def results(self):
+        """ Return (outcome counts, sum of actions, sum of squared actions) of all games.
+        """
+        counts = np.bincount(self.outcome, minlength=len(OUTCOMES))
+        return ({outcome: int(counts[code]) for code, outcome in enumerate(OUTCOMES)}, int(self.actions.sum()),
+                int((self.actions ** 2).sum()))
+
+
+###########
+# HELPERS #
+###########
+
+def simulate(n_games, seed=None, shoot=SIM_SHOOT, max_shots=SIM_MAX_SHOTS, max_actions=SIM_MAX_ACTIONS,
+             chunk=SIM_CHUNK):
+    """ Simulate given number of games vectorized (in chunks) and return results (see Simulation.results()).
+    """
+    # Accumulate results of chunks
+    rng = np.random.default_rng(seed) if np is not None else None
+    counts, actions, actions_squared = dict.fromkeys(OUTCOMES, 0), 0, 0
+    for n_game in range(0, n_games, chunk):
+        simulation = Simulation(min(chunk, n_games - n_game), rng=rng)
+        simulation.run(shoot, max_shots, max_actions)
+        chunk_counts, chunk_actions, chunk_actions_squared = simulation.results()
+        for outcome, count in chunk_counts.items():
+            counts[outcome] += count
+        actions += chunk_actions
+        actions_squared += chunk_actions_squared
+    return counts, actions, actions_squared
+
+
+def simulate_scalar(n_games, seed=None, shoot=SIM_SHOOT, max_shots=SIM_MAX_SHOTS, max_actions=SIM_MAX_ACTIONS):
+    """ Play given number of games with sessions and return results (see Simulation.results()).
+
+    Sessions of distinct clients draw from random streams keyed by the seed as server secret (if given).
+    """
+    # Prepare random generators
+    rnd = random.Random(seed)
+    key = random_key(str(seed).encode()) if seed is not None else None
+
+    # Play games with the same player policy as simulations
+    counts, actions, actions_squared = dict.fromkeys(OUTCOMES, 0), 0, 0
+    for n_game in range(n_games):
+        session = Session(lambda message: None, n_game.to_bytes(16, 'big'), key)
+        session.new()
+        output, n_actions = list(), 0
+        while session.won is False and session.lost is False and n_actions < max_actions:
+            n_actions += 1
+            if rnd.random() < shoot:
+                output = session.shoot(rnd.sample(range(1, N_ROOMS + 1), rnd.randint(1, max_shots)))
+            else:
+                output = session.move(rnd.choice(ROOMS[session.entities.player]))
+
+        # Classify outcome by last output
+        outcome = 'live'
+        if session.won is True:
+            outcome = 'won'
+        elif session.lost is True:
+            outcome = 'ammo'
+            for oid, loss in ((Output.ACTION_MOVE_PIT, 'pit'), (Output.ACTION_WUMPUS_GOTCHA, 'wumpus'),
+                              (Output.ACTION_SHOOT_SELF, 'self')):
+                if oid in output:
+                    outcome = loss
+        counts[outcome] += 1
+        actions += n_actions
+        actions_squared += n_actions ** 2
+    return counts, actions, actions_squared
+
+
+def compare(n_games, n_scalar, seed=None, tolerance=SIM_TOLERANCE, **policy):
+    """ Compare outcome rates and mean actions of simulated games with games played with sessions.
+
+    Returns (passed, [(name, simulated, scalar, z)]) with z the difference in standard errors (two-proportion z-test
+    for outcome rates, Welch's z for mean actions); passed if all differences are within the given tolerance.
+    """
+    # Run both implementations
+    vector = simulate(n_games, seed=seed, **policy)
+    scalar = simulate_scalar(n_scalar, seed=seed, **policy)
+
+    # Compare outcome rates
+    rows = list()
+    for outcome in OUTCOMES:
+        rate_vector, rate_scalar = vector[0][outcome] / n_games, scalar[0][outcome] / n_scalar
+        rate = (vector[0][outcome] + scalar[0][outcome]) / (n_games + n_scalar)
+        error = math.sqrt(rate * (1 - rate) * (1 / n_games + 1 / n_scalar))
+        rows.append((outcome, rate_vector, rate_scalar, (rate_vector - rate_scalar) / error if error > 0 else 0.0))
+
+    # Compare mean actions
+    means, variances = list(), list()
+    for (_, actions, actions_squared), count in ((vector, n_games), (scalar, n_scalar)):
+        means.append(actions / count)
+        variances.append(max(actions_squared / count - (actions / count) ** 2, 0) / count)
+    error = math.sqrt(sum(variances))
+    rows.append(('actions', means[0], means[1], (means[0] - means[1]) / error if error > 0 else 0.0))
+
+    # Check deviations
+    return all(abs(z) <= tolerance for _, _, _, z in rows), rows
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+"""
+
+# System imports
+import collections
+import http.server
+import os
+import socket
+import socketserver
+import threading
+import time
+
+# Local imports
+from wumpus.const import Input
+
+# Histogram buckets (powers of two in microseconds, up to ~67s)
+HISTOGRAM_BUCKETS = 27
+
+# Game engine stages (with latency histograms)
+METRICS_STAGES = ('parse', 'session', 'render')
+
+# Probe paths through the game engine (repeated probes within a batch share the reply of their first probe)
+METRICS_PATHS = ('static', 'cached', 'limited', 'handled', 'repeated')
+
+# Distinct (command, action) counters (further actions are counted as unknown)
+METRICS_COMMANDS = 1024
+
+# Game action names
+GAME_ACTION_NAMES = {value: name.lower() for name, value in vars(Input.Game).items() if name.isupper() is True}
+
+
+class Histogram:
+    """ Latency histogram with logarithmic (power of two microsecond) buckets.
+    """
+    def __init__(self):
+        """ Initialize histogram.
+        """
+        # Prepare internals
+        self.counts = [0] * (HISTOGRAM_BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """ Add latency sample (in seconds).
+        """
+        # Count sample in bucket of next power of two microseconds
+        self.counts[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """ Return upper bucket bound (in seconds) below which given percentage of samples fall.
+        """
+        # Accumulate bucket counts
+        threshold, seen = self.count * percent / 100.0, 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold and seen > 0:
+                return min((2**bucket) / 1e6, self.max)
+        return 0.0
+
+    def bounds(self):
+        """ Return (upper bound in seconds, cumulative count) per bucket.
+        """
+        # Accumulate bucket counts
+        bounds, seen = list(), 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            bounds.append(((2**bucket) / 1e6, seen))
+        return bounds
+
+    def summary(self):
+        """ Return short textual summary.
+        """
+        mean = self.total / self.count if self.count > 0 else 0.0
+        return (f'n={self.count}, mean={mean * 1e6:.1f}us, p50<={self.percentile(50) * 1e6:.0f}us, '
+                f'p99<={self.percentile(99) * 1e6:.0f}us, max={self.max * 1e6:.0f}us')
+
+
+class Metrics:
+    """ Probe counters and per-stage latency histograms of a game engine.
+
+    Counting takes a dictionary update per probe and stage timing two clock reads per stage, so metrics are cheap
+    enough to stay enabled in production. Game engines without metrics skip all instrumentation (see Game). Counters
+    are updated without locks, so counts of game engines handling input in several threads are approximate.
+    """
+    def __init__(self):
+        """ Initialize metrics.
+        """
+        # Prepare internals
+        self.paths = dict.fromkeys(METRICS_PATHS, 0)
+        self.commands = dict()
+        self.errors = 0
+        self.sessions_created = 0
+        self.sessions_expired = 0
+        self.stages = collections.OrderedDict((stage, Histogram()) for stage in METRICS_STAGES)
+
+    def command(self, cmd, action):
+        """ Count probe of given input command and action (shoot actions by number of rooms).
+        """
+        # Select counter (bounding the number of counters)
+        if cmd == Input.Shoot and action is not None:
+            action = len(action)
+        key = (cmd, action)
+        count = self.commands.get(key, None)
+        if count is None:
+            if len(self.commands) >= METRICS_COMMANDS:
+                key = (cmd, None)
+            count = self.commands.get(key, 0)
+
+        # Count probe
+        self.commands[key] = count + 1
+
+    def lap(self, stage, start):
+        """ Add latency of given stage started at <start> (see time.perf_counter()) and return current time.
+        """
+        now = time.perf_counter()
+        self.stages[stage].add(now - start)
+        return now
+
+    def render(self, gauges=()):
+        """ Return metrics in Prometheus text format (with additional (name, type, help, value) tuples).
+        """
+        # Render probe counters
+        lines = list()
+        lines += metric_header('wumpus_probes_total', 'counter', 'Probes by path through the game engine.')
+        lines += [f'wumpus_probes_total{{path="{path}"}} {count}' for path, count in list(self.paths.items())]
+        lines += metric_header('wumpus_commands_total', 'counter', 'Handled probes by input command and action.')
+        for (cmd, action), count in sorted(list(self.commands.items()), key=str):
+            cmd_label = cmd.__name__.lower() if cmd is not None else 'invalid'
+            action_label = GAME_ACTION_NAMES.get(action, action) if cmd == Input.Game else action
+            action_label = action_label if action_label is not None else 'unknown'
+            lines.append(f'wumpus_commands_total{{cmd="{cmd_label}",action="{action_label}"}} {count}')
+
+        # Render error and session counters (and additional gauges)
+        counters = [('wumpus_errors_total', 'counter', 'Probes with invalid commands.', self.errors),
+                    ('wumpus_sessions_created_total', 'counter', 'Created sessions.', self.sessions_created),
+                    ('wumpus_sessions_expired_total', 'counter', 'Expired sessions.', self.sessions_expired)]
+        for name, metric_type, description, value in counters + list(gauges):
+            lines += metric_header(name, metric_type, description)
+            lines.append(f'{name} {value}')
+
+        # Render stage latency histograms
+        lines += metric_header('wumpus_stage_seconds', 'histogram', 'Latency of game engine stages.')
+        for stage, histogram in self.stages.items():
+            count, total = histogram.count, histogram.total
+            lines += [f'wumpus_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {seen}'
+                      for bound, seen in histogram.bounds()]
+            lines.append(f'wumpus_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'wumpus_stage_seconds_sum{{stage="{stage}"}} {total:.9f}')
+            lines.append(f'wumpus_stage_seconds_count{{stage="{stage}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """ Answer HTTP requests with current metrics (see serve_metrics()).
+    """
+    def do_GET(self):  # pylint: disable=invalid-name
+        """ Send metrics text.
+        """
+        body = self.server.collect().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """ Skip request logging.
+        """
+
+
+class MetricsServer(socketserver.TCPServer):
+    """ Serve metrics on a TCP port.
+    """
+    allow_reuse_address = True
+
+
+class MetricsServer6(MetricsServer):
+    """ Serve metrics on an IPv6 TCP port.
+    """
+    address_family = socket.AF_INET6
+
+
+class UnixMetricsServer(socketserver.UnixStreamServer):
+    """ Serve metrics on a Unix socket.
+    """
+
+
+###########
+# HELPERS #
+###########
+
+def metric_header(name, metric_type, description):
+    """ Return Prometheus help and type lines of given metric.
+    """
+    return [f'# HELP {name} {description}', f'# TYPE {name} {metric_type}']
+
+
+def serve_metrics(address, collect):
+    """ Serve metrics text returned by <collect> via HTTP on '<host>:<port>' or a Unix socket path in the background.
+
+    Returns the server (stopped with shutdown()).
+    """
+    # Bind TCP port (IPv6 hosts in brackets) or Unix socket (replacing a stale socket file)
+    if address.startswith('/') is False and ':' in address:
+        host, port = address.rsplit(':', 1)
+        server_class = MetricsServer6 if host.startswith('[') is True else MetricsServer
+        server = server_class((host.strip('[]'), int(port)), MetricsHandler)
+    else:
+        if os.path.exists(address) is True:
+            os.unlink(address)
+        server = UnixMetricsServer(address, MetricsHandler)
+    server.collect = collect
+
+    # Answer requests in background thread
+    threading.Thread(target=server.serve_forever, name='wumpus-metrics', daemon=True).start()
+    return server
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+TRACE_THE_WUMPUS
+Copyright (C) 2014-2025 Leitwert GmbH
+
+This software is distributed under the terms of the MIT license.
+It can be found in the LICENSE file or at https://opensource.org/licenses/MIT.
+
+Author Johann SCHLAMP <schlamp@leitwert.net>
+Author Leonhard RABEL <rabel@leitwert.net>
+"""
+
+# System imports
+import collections
+import itertools
+import threading
+
+# Local imports
+from wumpus.session import Session
+from wumpus.session import SESSION_FLAGS_OFFSET
+from wumpus.session import SESSION_LIVE
+
+# Least recently updated sessions inspected for eviction
+EVICT_SCAN = 8
+
+# Session locks of stores shared between threads (clients share locks by hash)
+STORE_LOCK_STRIPES = 64
+
+
+class NoLock:
+    """ Placeholder lock for sessions only accessed by a single thread.
+    """
+    def __enter__(self):
+        """ Acquire (nothing).
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """ Release (nothing).
+        """
+        return False
+
+
+# Shared placeholder lock
+NO_LOCK = NoLock()
+
+
+class SessionStore:
+    """ Keep track of player sessions ordered by last update.
+
+    Sessions are kept in least recently updated order, so expired sessions are always found at the front. Expiry thus
+    only inspects sessions that actually expired (plus one), independent of the total number of sessions.
+
+    Sessions restored from a snapshot are kept as packed records (see Session.pack()) and only unpacked when accessed.
+
+    If the number of sessions is limited, adding a session beyond the limit evicts one of the least recently updated
+    sessions, preferring sessions without a live game.
+
+    If shared between threads (see <stripes>), the table is guarded by a mutex held for single operations only, and
+    sessions by a fixed number of striped locks: clients hashing to the same stripe share a lock (see lock()).
+    """
+    def __init__(self, log=None, max_sessions=None, key=None, stripes=None):
+        """ Initialize session store (with log function and random key for restored sessions).
+
+        Sessions are only guarded by locks if a number of lock stripes is given.
+        """
+        # Prepare internals
+        self.sessions = collections.OrderedDict()
+        self.log = log
+        self.key = key
+        self.max_sessions = max_sessions
+        self.evicted = 0
+
+        # Prepare locks (if shared between threads)
+        self.mutex = threading.RLock() if stripes is not None else NO_LOCK
+        self.stripes = [threading.RLock() for _ in range(stripes)] if stripes is not None else None
+
+    def get(self, client, default=None):
+        """ Return session of given client.
+        """
+        with self.mutex:
+            session = self.sessions.get(client, None)
+            if session is None:
+                return default
+            return self.unpack(client, session)
+
+    def add(self, client, session):
+        """ Add (or replace) session of given client.
+        """
+        # Insert session as most recently updated (evicting a session if full)
+        with self.mutex:
+            if (self.max_sessions is not None and len(self.sessions) >= self.max_sessions
+                    and client not in self.sessions):
+                self.evict()
+            self.sessions[client] = session
+            self.sessions.move_to_end(client)
+
+    def commit(self, client, session):
+        """ Write back changed session of given client (sessions are kept as objects, so nothing to do).
+        """
+
+    def lock(self, client):
+        """ Return lock guarding given client's session (not needed within a single thread).
+        """
+        if self.stripes is None:
+            return NO_LOCK
+        return self.stripes[hash(client) % len(self.stripes)]
+
+    def add_packed(self, client, record):
+        """ Add session of given client as packed record (unpacked on first access).
+        """
+        # Insert record as most recently updated (evicting a session if full)
+        with self.mutex:
+            if (self.max_sessions is not None and len(self.sessions) >= self.max_sessions
+                    and client not in self.sessions):
+                self.evict()
+            self.sessions[client] = record
+            self.sessions.move_to_end(client)
+
+    def add_packed_all(self, clients, records):
+        """ Add sessions of given clients as packed records (ordered least recently updated first, see add_packed()).
+
+        Records are inserted at once into an empty store (keeping the most recently updated sessions if limited).
+        """
+        with self.mutex:
+            # Insert records one by one into a non-empty store
+            if len(self.sessions) > 0:
+                for client, record in zip(clients, records):
+                    self.add_packed(client, record)
+                return
+
+            # Insert records at once
+            if self.max_sessions is not None and len(records) > self.max_sessions:
+                skip = len(records) - self.max_sessions
+                clients, records = clients[skip:], records[skip:]
+            self.sessions.update(zip(clients, records))
+
+    def evict(self):
+        """ Remove one of the least recently updated sessions (preferring sessions without a live game).
+        """
+        # Inspect least recently updated sessions
+        victim = None
+        for client, session in itertools.islice(self.sessions.items(), EVICT_SCAN):
+            if victim is None:
+                victim = client
+            if isinstance(session, bytes) is True:
+                live = session[SESSION_FLAGS_OFFSET] & SESSION_LIVE != 0
+            else:
+                live = session.live
+            if live is False:
+                victim = client
+                break
+
+        # Remove session
+        if victim is not None:
+            del self.sessions[victim]
+            self.evicted += 1
+
+    def packed(self):
+        """ Return iterator of packed session records (of the sessions at call time, least recently updated first).
+
+        Sessions are only packed while iterating (each while holding its client's lock), so the records may be written
+        by another thread while sessions are in use.
+        """
+        with self.mutex:
+            sessions = list(self.sessions.items())
+        return self.pack_sessions(sessions)
+
+    def pack_sessions(self, sessions):
+        """ Iterate packed records of given (client, session) pairs.
+        """
+        for client, session in sessions:
+            if isinstance(session, bytes) is True:
+                yield session
+                continue
+            with self.lock(client):
+                record = session.pack()
+            yield record
+
+    def unpack(self, client, session):
+        """ Unpack given session of client if still packed.
+        """
+        if isinstance(session, bytes) is True:
+            session = Session.unpack(self.log, session, key=self.key)
+            self.sessions[client] = session
+        return session
+
+    def touch(self, client):
+        """ Renew timeout of given client's session.
+        """
+        # Update session and move to most recently updated
+        with self.mutex:
+            session = self.get(client, None)
+            if session is not None:
+                session.update()
+                self.sessions.move_to_end(client)
+            return session
+
+    def expire(self):
+        """ Remove expired sessions (least recently updated first).
+        """
+        # Pop sessions until first non-expired session
+        n_expired = 0
+        with self.mutex:
+            while len(self.sessions) > 0:
+                client, session = next(iter(self.sessions.items()))
+                if self.unpack(client, session).expired() is False:
+                    break
+                del self.sessions[client]
+                n_expired += 1
+
+        # Return number of removed sessions
+        return n_expired
+
+    def __getitem__(self, client):
+        """ Return session of given client.
+        """
+        with self.mutex:
+            return self.unpack(client, self.sessions[client])
+
+    def __delitem__(self, client):
+        """ Remove session of given client.
+        """
+        with self.mutex:
+            del self.sessions[client]
+
+    def __contains__(self, client):
+        """ Check if client has a session.
+        """
+        return client in self.sessions
+
+    def __iter__(self):
+        """ Iterate clients (least recently updated first).
+        """
+        return iter(self.sessions)
+
+    def __len__(self):
+        """ Return number of sessions.
+        """
+        return len(self.sessions)